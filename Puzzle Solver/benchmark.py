@@ -0,0 +1,426 @@
+"""
+Benchmarks of the solvers in puzzle_tools over a fixed corpus of puzzles
+from every family: graded 9x9 and 16x16 sudokus, 8- and 15-puzzles of
+known optimal depth, peg solitaire boards, and word ladders (when a words
+file is available).
+
+Run as a script to time every solver on every puzzle it suits, print a
+summary, and write the results as JSON; with --compare, the results are
+checked against an earlier run and any regressions are reported.
+
+    python benchmark.py --repeats 5 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from grid_peg_solitaire_puzzle import BitboardPegSolitairePuzzle
+from mn_puzzle import MNPuzzle
+from puzzle_tools import (PuzzleNode, SearchStats, astar_solve,
+                          bidirectional_solve, breadth_first_solve,
+                          depth_first_solve, ida_star_solve,
+                          inplace_depth_first_solve, lazy_depth_first_solve)
+from sudoku_puzzle import SudokuPuzzle
+from word_graph import load_word_graph
+from word_ladder_puzzle import WordLadderPuzzle
+
+
+class BenchmarkCase:
+    """
+    A puzzle of the benchmark corpus and the strategies to run on it.
+
+    name - unique name of the case
+    family - "sudoku", "mn", "peg" or "word"
+    make - function returning a fresh copy of the puzzle
+    strategies - names of the STRATEGIES to run
+    depth - number of moves of an optimal solution, or None if unknown
+    solvable - whether the puzzle has a solution
+    slow - whether the case is only run with --full
+    """
+
+    def __init__(self, name, family, make, strategies, depth=None,
+                 solvable=True, slow=False):
+        """
+        Create a new BenchmarkCase self.
+
+        @type self: BenchmarkCase
+        @type name: str
+        @type family: str
+        @type make: () -> Puzzle
+        @type strategies: list[str]
+        @type depth: int | None
+        @type solvable: bool
+        @type slow: bool
+        @rtype: None
+        """
+        self.name, self.family, self.make = name, family, make
+        self.strategies, self.depth = strategies, depth
+        self.solvable, self.slow = solvable, slow
+
+
+def _exact_cover(puzzle, stats):
+    """
+    Return the solution of SudokuPuzzle puzzle found by dancing links.
+
+    @type puzzle: SudokuPuzzle
+    @type stats: SearchStats
+    @rtype: SudokuPuzzle | None
+    """
+    return puzzle.exact_cover_solve()
+
+
+# each strategy takes a puzzle and the SearchStats to record, and returns
+# a path to a solution, a solved puzzle, or None
+STRATEGIES = {
+    "depth_first": lambda puzzle, stats: depth_first_solve(puzzle,
+                                                           stats=stats),
+    "depth_first_symmetric": lambda puzzle, stats: depth_first_solve(
+        puzzle, stats=stats, symmetry=True),
+    "depth_first_lazy": lambda puzzle, stats: lazy_depth_first_solve(
+        puzzle, stats=stats),
+    "depth_first_inplace": lambda puzzle, stats: inplace_depth_first_solve(
+        puzzle, stats=stats),
+    "breadth_first": lambda puzzle, stats: breadth_first_solve(
+        puzzle, check_on_push=True, stats=stats),
+    "astar": lambda puzzle, stats: astar_solve(puzzle, stats=stats),
+    "ida_star": lambda puzzle, stats: ida_star_solve(puzzle, stats=stats),
+    "bidirectional": lambda puzzle, stats: bidirectional_solve(puzzle,
+                                                               stats=stats),
+    "exact_cover": _exact_cover,
+}
+# strategies that always find a shortest path
+OPTIMAL = {"breadth_first", "astar", "ida_star", "bidirectional"}
+
+_DIGITS = set("123456789")
+_HEX = set("0123456789ABCDEF")
+_SUDOKUS = [
+    ("sudoku-9-2015-07-09", _DIGITS, "***7*8*1***7*9***69*31*****35*8**6*1"
+     "*********1*6**9*48*****12*78***7*4***6*3*2***"),
+    ("sudoku-9-three-star", _DIGITS, "***9*2****91***63**3**7**8*3*******8"
+     "**9***2**5*******7*7**8**4**45***81****3*6***"),
+    ("sudoku-9-four-star", _DIGITS, "56***7**9*7**48*31*********43*******"
+     "*8*****9********26*********19*36**7*7**1***42"),
+    ("sudoku-9-hardest", _DIGITS, "8**********36******7**9*2***5***7****"
+     "***457*****1***3***1****68**85***1**9****4**"),
+    ("sudoku-16-easy", _HEX, "A0*E3**8D**C**B**36**CD4B**70****9******A0"
+     "E23856***10*****86**DC*D**E0*A6*53**1*****D***2EA0*5632*0*8**5*4C*"
+     "*B**6**5*9**7*BFEA*04C1D7B***20A6385*6*3C14D*7FB20*A****65**4CD17*"
+     "*****F2*E*86*5C*41C**9BDF70*2E5****B***E02356*19*4*A**5*3**19**7F"
+     "*3**6**C9FB*D*2*E"),
+    ("sudoku-16-medium", _HEX, "*9F**12*7CB*6*80*6*0*D*****1*F**E*1***0*A"
+     "*4FC***7****F**860***E2*B**4A*******5F1***1**3694**B7*D6*8*****F**"
+     "54******E2*****D*08***1*F36*******CB7*E*A**F5*****6*8*D****A40***1"
+     "*5F*3*8D*7B*1*2**4**F***0**2*947***3***7BC*1***A***2*49***1D7*B8*3"
+     "*D*BC****38*0F**5"),
+    ("sudoku-16-hard", _HEX, "*72**E**C306****4D****C****E**95***3**97*B*"
+     "**E**1*E**A4*****0***F*18D**A2**56**03***7*2*B*A*E***B*4*****F8E*95"
+     "*7*****1*****C**B**1***B***9***3*6*28***5*06*34B****BA6**C******7*"
+     "0C****72D*****5*630*2****4**F**1*5**1**F**3**D*4A****06****9******"
+     "**4***8*57****"),
+]
+# (name, rows of from_grid, optimal depth, whether only run with --full)
+_SLIDING = [
+    ("mn-2x3-main", ["*23", "145"], 3, False),
+    ("mn-3x3-d12", ["236", "1*7", "548"], 12, False),
+    ("mn-3x3-d20", ["153", "8*7", "426"], 20, False),
+    ("mn-3x3-d24", ["71*", "654", "283"], 24, False),
+    ("mn-3x3-d31", ["867", "254", "3*1"], 31, False),
+    ("mn-4x4-d20", ["5 1 2 3", "9 6 7 4", "14 13 10 8", "11 12 15 *"], 20,
+     False),
+    ("mn-4x4-d30", ["1 2 * 6", "3 10 7 4", "9 15 5 8", "14 13 11 12"], 30,
+     False),
+    ("mn-4x4-d32", ["1 4 8 7", "9 5 10 3", "* 2 11 15", "13 12 6 14"], 32,
+     False),
+    ("mn-4x4-d42", ["* 2 5 12", "11 1 3 7", "9 13 15 4", "14 6 10 8"], 42,
+     True),
+]
+# (name, rows of marker, whether solvable, whether only run with --full)
+_PEG_BOARDS = [
+    ("peg-4x4-solvable", ["*.**", "****", "****", "****"], True, False),
+    ("peg-4x4-unsolvable", [".***", "****", "****", "****"], False, False),
+    ("peg-5x5-main", ["*****", "*****", "*****", "**.**", "*****"], True,
+     False),
+    ("peg-6x6", ["******", "******", "**.***", "******", "******",
+                 "******"], True, False),
+    ("peg-english", ["##***##", "##***##", "*******", "***.***", "*******",
+                     "##***##", "##***##"], True, True),
+]
+_LADDERS = [("same", "cost"), ("cold", "warm"), ("head", "tail")]
+
+
+def corpus(words=None, full=False):
+    """
+    Return the BenchmarkCases of the corpus, leaving out the slow ones
+    unless full is True, and the word ladders unless words is the path of
+    a words file.
+
+    @type words: str | None
+    @type full: bool
+    @rtype: list[BenchmarkCase]
+
+    >>> cases = corpus()
+    >>> sorted(set([case.family for case in cases]))
+    ['mn', 'peg', 'sudoku']
+    >>> len(set([case.name for case in cases])) == len(cases)
+    True
+    """
+    cases = []
+    for name, symbol_set, symbols in _SUDOKUS:
+        n = len(symbol_set)
+        cases.append(BenchmarkCase(
+            name, "sudoku",
+            lambda n=n, symbols=symbols, symbol_set=symbol_set:
+            SudokuPuzzle(n, list(symbols), symbol_set, propagate=True),
+            ["depth_first", "depth_first_lazy", "depth_first_inplace",
+             "exact_cover"]))
+    for name, rows, depth, slow in _SLIDING:
+        from_grid = tuple([tuple(row.split()) if " " in row else tuple(row)
+                           for row in rows])
+        symbols = sorted([symbol for row in from_grid for symbol in row
+                          if symbol != "*"], key=int)
+        symbols.append("*")
+        m = len(from_grid[0])
+        to_grid = tuple([tuple(symbols[i:i + m])
+                         for i in range(0, len(symbols), m)])
+        if len(symbols) <= 9:
+            strategies = ["breadth_first", "astar", "ida_star",
+                          "bidirectional"]
+        else:
+            strategies = ["ida_star"] if slow else ["astar", "ida_star"]
+        cases.append(BenchmarkCase(
+            name, "mn",
+            lambda from_grid=from_grid, to_grid=to_grid:
+            MNPuzzle(from_grid, to_grid), strategies, depth, slow=slow))
+    for name, rows, solvable, slow in _PEG_BOARDS:
+        cases.append(BenchmarkCase(
+            name, "peg",
+            lambda rows=rows: BitboardPegSolitairePuzzle(
+                [list(row) for row in rows], {"*", ".", "#"}),
+            ["depth_first", "depth_first_lazy", "depth_first_inplace",
+             "depth_first_symmetric"],
+            solvable=solvable,
+            slow=slow))
+    if words is not None and os.path.exists(words):
+        word_set = load_word_graph(words)
+        for from_word, to_word in _LADDERS:
+            cases.append(BenchmarkCase(
+                "word-{}-{}".format(from_word, to_word), "word",
+                lambda from_word=from_word, to_word=to_word:
+                WordLadderPuzzle(from_word, to_word, word_set),
+                ["breadth_first", "astar", "bidirectional"],
+                solvable=from_word in word_set and to_word in word_set))
+    return [case for case in cases if full or not case.slow]
+
+
+def percentile(values, q):
+    """
+    Return the q-th percentile of values, interpolating linearly between
+    the nearest ranks.
+
+    @type values: list[float]
+    @type q: float
+    @rtype: float
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.5
+    >>> percentile([3.0], 90)
+    3.0
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def run_case(case, strategy, repeats):
+    """
+    Run strategy on fresh copies of the puzzle of BenchmarkCase case
+    repeats times, and once more to measure memory, and return a record of
+    the results.
+
+    @type case: BenchmarkCase
+    @type strategy: str
+    @type repeats: int
+    @rtype: dict
+    """
+    solve = STRATEGIES[strategy]
+    latencies = []
+    for _ in range(repeats):
+        puzzle, stats = case.make(), SearchStats()
+        start = time.perf_counter()
+        result = solve(puzzle, stats)
+        latencies.append(time.perf_counter() - start)
+    # tracemalloc slows the search down, so memory gets a run of its own
+    puzzle = case.make()
+    tracemalloc.start()
+    solve(puzzle, SearchStats())
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    solution, length = _solution(result)
+    if case.solvable:
+        ok = solution is not None and solution.is_solved()
+        if ok and case.depth is not None and strategy in OPTIMAL:
+            ok = length == case.depth
+    else:
+        ok = solution is None
+    median = percentile(latencies, 50)
+    return {"case": case.name, "family": case.family, "strategy": strategy,
+            "repeats": repeats, "latencies": latencies,
+            "mean": sum(latencies) / len(latencies), "p50": median,
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "expanded": stats.expanded, "generated": stats.generated,
+            "nodes_per_second": stats.expanded / median if median else 0.0,
+            "peak_frontier": stats.peak_frontier,
+            "peak_visited": stats.peak_visited,
+            "peak_memory": peak_memory, "solution_length": length,
+            "ok": ok}
+
+
+def _solution(result):
+    """
+    Return the solved puzzle in result, as returned by a strategy, and the
+    number of moves on its path (None if result is not a path).
+
+    @type result: PuzzleNode | Puzzle | None
+    @rtype: (Puzzle | None, int | None)
+    """
+    if result is None:
+        return None, None
+    if not isinstance(result, PuzzleNode):
+        return result, None
+    length = 0
+    while result.children:
+        result, length = result.children[0], length + 1
+    return result.puzzle, length
+
+
+def run(cases, repeats=5, report=None):
+    """
+    Run every strategy of every case in cases, calling report with each
+    record as it is made, and return the results: the records and a
+    description of the machine and run.
+
+    @type cases: list[BenchmarkCase]
+    @type repeats: int
+    @type report: (dict) -> object | None
+    @rtype: dict
+    """
+    records = []
+    for case in cases:
+        for strategy in case.strategies:
+            records.append(run_case(case, strategy, repeats))
+            if report is not None:
+                report(records[-1])
+    return {"machine": {"python": platform.python_version(),
+                        "implementation": platform.python_implementation(),
+                        "platform": platform.platform(),
+                        "processor": platform.processor(),
+                        "cpus": os.cpu_count()},
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeats": repeats, "records": records}
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Return descriptions of the regressions of the results current against
+    the results baseline: runs that became wrong, or whose median latency
+    or peak memory grew by more than threshold (a fraction).
+
+    @type baseline: dict
+    @type current: dict
+    @type threshold: float
+    @rtype: list[str]
+
+    >>> before = {"records": [{"case": "c", "strategy": "s", "ok": True,
+    ...                        "p50": 1.0, "peak_memory": 100}]}
+    >>> after = {"records": [{"case": "c", "strategy": "s", "ok": True,
+    ...                       "p50": 1.5, "peak_memory": 100}]}
+    >>> compare(before, after)
+    ['c s: median latency 1.0000s -> 1.5000s']
+    >>> compare(after, before)
+    []
+    """
+    old = {(record["case"], record["strategy"]): record
+           for record in baseline["records"]}
+    regressions = []
+    for record in current["records"]:
+        key = (record["case"], record["strategy"])
+        if key not in old:
+            continue
+        before, name = old[key], "{} {}".format(*key)
+        if before["ok"] and not record["ok"]:
+            regressions.append("{}: no longer solved correctly".format(name))
+        if record["p50"] > before["p50"] * (1 + threshold):
+            regressions.append("{}: median latency {:.4f}s -> {:.4f}s".format(
+                name, before["p50"], record["p50"]))
+        if record["peak_memory"] > before["peak_memory"] * (1 + threshold):
+            regressions.append("{}: peak memory {} -> {} bytes".format(
+                name, before["peak_memory"], record["peak_memory"]))
+    return regressions
+
+
+def _print_record(record):
+    """
+    Print a one-line summary of the benchmark record.
+
+    @type record: dict
+    @rtype: None
+    """
+    print("{:22} {:22} p50 {:9.4f}s p90 {:9.4f}s {:>10.0f} nodes/s "
+          "{:>9.1f} KiB{}".format(
+              record["case"], record["strategy"], record["p50"],
+              record["p90"], record["nodes_per_second"],
+              record["peak_memory"] / 1024,
+              "" if record["ok"] else "  WRONG"))
+    sys.stdout.flush()
+
+
+def main(arguments=None):
+    """
+    Run the benchmarks as described by the command line arguments, and
+    return the exit status: 1 if any run was wrong or regressed, 0
+    otherwise.
+
+    @type arguments: list[str] | None
+    @rtype: int
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the solvers.")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="timed runs of each strategy on each puzzle")
+    parser.add_argument("--output", default="benchmark.json",
+                        help="file to write the results to")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="growth counted as a regression (fraction)")
+    parser.add_argument("--family", action="append",
+                        choices=["sudoku", "mn", "peg", "word"],
+                        help="only run this puzzle family (repeatable)")
+    parser.add_argument("--words", default="words",
+                        help="words file for the word ladder cases")
+    parser.add_argument("--full", action="store_true",
+                        help="also run the slow cases")
+    options = parser.parse_args(arguments)
+    cases = [case for case in corpus(options.words, options.full)
+             if options.family is None or case.family in options.family]
+    results = run(cases, options.repeats, _print_record)
+    with open(options.output, "w") as output:
+        json.dump(results, output, indent=2)
+    failed = not all([record["ok"] for record in results["records"]])
+    if options.compare is not None:
+        with open(options.compare) as baseline:
+            regressions = compare(json.load(baseline), results,
+                                  options.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        failed = failed or len(regressions) != 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Exact cover by Knuth's Algorithm X with dancing links.
+
+An exact cover problem has a set of columns and a list of rows, each
+covering some of the columns; a solution is a choice of rows covering every
+column exactly once.
+"""
+
+
+class ExactCover:
+    """
+    An exact cover problem, held as the circular doubly-linked lists of
+    dancing links.  Nodes are indexes into parallel lists: node 0 is the
+    root, nodes 1 to the number of columns are the column headers, and the
+    rest are the 1s of the rows.
+    """
+
+    def __init__(self, columns, rows):
+        """
+        Create a new ExactCover self with columns numbered from 0 up to
+        columns and rows[i] listing the columns covered by row i.
+
+        @type self: ExactCover
+        @type columns: int
+        @type rows: list[list[int]]
+        @rtype: None
+        """
+        headers = columns + 1
+        # links left, right, up and down, and column and row of each node
+        self._left = [i - 1 for i in range(headers)]
+        self._right = [i + 1 for i in range(headers)]
+        self._left[0], self._right[-1] = columns, 0
+        self._up, self._down = list(range(headers)), list(range(headers))
+        self._column, self._row = list(range(headers)), [-1] * headers
+        self._size = [0] * headers
+        # the first node of each row, for select
+        self._first = []
+        for i in range(len(rows)):
+            first = len(self._column)
+            self._first.append(first)
+            for column in rows[i]:
+                node, header = len(self._column), column + 1
+                self._column.append(header)
+                self._row.append(i)
+                self._left.append(node - 1)
+                self._right.append(node + 1)
+                self._up.append(self._up[header])
+                self._down.append(header)
+                self._down[self._up[header]] = node
+                self._up[header] = node
+                self._size[header] += 1
+            if len(self._column) > first:
+                self._left[first] = len(self._column) - 1
+                self._right[-1] = first
+        self._selected, self._feasible = [], True
+
+    def select(self, row):
+        """
+        Put row into every solution of ExactCover self, as if it had been
+        chosen first.
+
+        @type self: ExactCover
+        @type row: int
+        @rtype: None
+        """
+        first = self._first[row]
+        node = first
+        while True:
+            header = self._column[node]
+            # a column already covered by a selected row can not be covered
+            # again
+            if self._left[self._right[header]] != header:
+                self._feasible = False
+                return
+            node = self._right[node]
+            if node == first:
+                break
+        self._selected.append(row)
+        self._cover(self._column[first])
+        node = self._right[first]
+        while node != first:
+            self._cover(self._column[node])
+            node = self._right[node]
+
+    def solutions(self, limit=None):
+        """
+        Yield the solutions of ExactCover self, each as the list of rows
+        chosen, until limit solutions have been yielded.
+
+        @type self: ExactCover
+        @type limit: int | None
+        @rtype: iterator[list[int]]
+
+        >>> problem = ExactCover(3, [[0, 1], [2], [0], [1, 2]])
+        >>> sorted([sorted(rows) for rows in problem.solutions()])
+        [[0, 1], [2, 3]]
+        >>> len(list(problem.solutions(1)))
+        1
+        """
+        if not self._feasible:
+            return
+        left, right, down = self._left, self._right, self._down
+        column, size = self._column, self._size
+        found, chosen, forward = 0, [], True
+        try:
+            while limit is None or found < limit:
+                if forward:
+                    if right[0] == 0:
+                        found += 1
+                        yield self._selected + [self._row[node]
+                                                for node in chosen]
+                        forward = False
+                        continue
+                    # the column with fewest rows left
+                    best, header = right[0], right[right[0]]
+                    while header != 0:
+                        if size[header] < size[best]:
+                            best = header
+                        header = right[header]
+                    if size[best] == 0:
+                        forward = False
+                        continue
+                    self._cover(best)
+                    node = down[best]
+                else:
+                    if len(chosen) == 0:
+                        return
+                    node = chosen.pop()
+                    other = left[node]
+                    while other != node:
+                        self._uncover(column[other])
+                        other = left[other]
+                    node = down[node]
+                    if node == column[node]:
+                        # every row of this column has been tried
+                        self._uncover(node)
+                        continue
+                chosen.append(node)
+                other = right[node]
+                while other != node:
+                    self._cover(column[other])
+                    other = right[other]
+                forward = True
+        finally:
+            # leave the links as they were for the next call
+            while len(chosen) != 0:
+                node = chosen.pop()
+                other = left[node]
+                while other != node:
+                    self._uncover(column[other])
+                    other = left[other]
+                self._uncover(column[node])
+
+    def _cover(self, header):
+        # Remove column header, and every row with a 1 in it from the other
+        # columns.
+        #
+        # @type self: ExactCover
+        # @type header: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        right[left[header]], left[right[header]] = right[header], left[header]
+        row = down[header]
+        while row != header:
+            node = right[row]
+            while node != row:
+                down[up[node]], up[down[node]] = down[node], up[node]
+                self._size[self._column[node]] -= 1
+                node = right[node]
+            row = down[row]
+
+    def _uncover(self, header):
+        # Undo _cover(header).
+        #
+        # @type self: ExactCover
+        # @type header: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        row = up[header]
+        while row != header:
+            node = left[row]
+            while node != row:
+                self._size[self._column[node]] += 1
+                down[up[node]], up[down[node]] = node, node
+                node = left[node]
+            row = up[row]
+        right[left[header]], left[right[header]] = header, header
@@ -59,6 +59,43 @@ class GridPegSolitairePuzzle(Puzzle):
         return (type(self) == type(other) and self._marker == other._marker and
                 self._marker_set == other._marker_set)
 
+    def __hash__(self):
+        """
+        Return a hash of GridPegSolitairePuzzle self consistent with __eq__.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "*", "*"], ["*", ".", "*"]]
+        >>> gpsp1 = GridPegSolitairePuzzle(grid, {"*", "."})
+        >>> gpsp2 = GridPegSolitairePuzzle([r[:] for r in grid], {"*", "."})
+        >>> hash(gpsp1) == hash(gpsp2)
+        True
+        """
+        return hash(self.state_key())
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of
+        GridPegSolitairePuzzle self: an int with bit (row * width + column)
+        set for every peg.  Boards with the same layout of unused cells have
+        equal keys if and only if they have the same pegs.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", ".", "#"], [".", ".", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key()
+        33
+        """
+        key, bit = 0, 1
+        for row in self._marker:
+            for cell in row:
+                if cell == "*":
+                    key |= bit
+                bit <<= 1
+        return key
+
     def __str__(self):
         """
         Return a user friendly representation of GridPegSolitairePuzzle self.
@@ -197,6 +234,129 @@ class GridPegSolitairePuzzle(Puzzle):
         n = len(self._marker[0])
         return self.row_configs(m, n) + self.col_configs(m, n)
 
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of GridPegSolitairePuzzle
+        self in the same order, copying the board for each jump only when
+        it is asked for.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: iterator[GridPegSolitairePuzzle]
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> list(gpsp.iter_extensions()) == gpsp.extensions()
+        True
+        """
+        for to, over, start in self._jumps():
+            new_marker = copy.deepcopy(self._marker)
+            new_marker[to[0]][to[1]] = "*"
+            new_marker[over[0]][over[1]] = "."
+            new_marker[start[0]][start[1]] = "."
+            yield GridPegSolitairePuzzle(new_marker, self._marker_set)
+
+    def legal_moves(self):
+        """
+        Return the moves of GridPegSolitairePuzzle self for apply, one for
+        each of its extensions and in the same order: the position a peg
+        jumps to, the position it jumps over and the position it starts
+        from.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: list[((int, int), (int, int), (int, int))]
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).legal_moves()
+        [((0, 2), (0, 1), (0, 0)), ((1, 0), (1, 1), (1, 2))]
+        """
+        return list(self._jumps())
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on GridPegSolitairePuzzle self in
+        place, so that it becomes the matching extension.
+
+        This moves pegs on the grid that __hash__ reads, so self must not
+        be a set member or dict key while it is moved.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: ((int, int), (int, int), (int, int))
+        @rtype: None
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> move = gpsp.legal_moves()[0]
+        >>> gpsp.apply(move)
+        >>> print(gpsp)
+        . . *
+        . * *
+        >>> gpsp.undo(move)
+        >>> print(gpsp)
+        * * .
+        . * *
+        """
+        to, over, start = move
+        self._marker[to[0]][to[1]] = "*"
+        self._marker[over[0]][over[1]] = "."
+        self._marker[start[0]][start[1]] = "."
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to GridPegSolitairePuzzle
+        self.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: ((int, int), (int, int), (int, int))
+        @rtype: None
+        """
+        to, over, start = move
+        self._marker[to[0]][to[1]] = "."
+        self._marker[over[0]][over[1]] = "*"
+        self._marker[start[0]][start[1]] = "*"
+
+    def _jumps(self):
+        # Yield each legal jump of GridPegSolitairePuzzle self as the
+        # empty position the peg lands on, the position it jumps over and
+        # the position it starts from, ordered as in extensions.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: iterator[((int, int), (int, int), (int, int))]
+        marker = self._marker
+        m, n = len(marker), len(marker[0])
+        for i in range(m):
+            for j in range(n):
+                if marker[i][j] == ".":
+                    if (j - 2 >= 0 and marker[i][j - 2] == "*" and
+                            marker[i][j - 1] == "*"):
+                        yield (i, j), (i, j - 1), (i, j - 2)
+                    if (j + 2 < n and marker[i][j + 2] == "*" and
+                            marker[i][j + 1] == "*"):
+                        yield (i, j), (i, j + 1), (i, j + 2)
+        for i in range(m):
+            for j in range(n):
+                if marker[i][j] == ".":
+                    if (i - 2 >= 0 and marker[i - 2][j] == "*" and
+                            marker[i - 1][j] == "*"):
+                        yield (i, j), (i - 1, j), (i - 2, j)
+                    if (i + 2 < m and marker[i + 2][j] == "*" and
+                            marker[i + 1][j] == "*"):
+                        yield (i, j), (i + 1, j), (i + 2, j)
+
+    def heuristic(self):
+        """
+        Return the number of jumps needed to solve GridPegSolitairePuzzle
+        self if it can be solved at all: each jump removes exactly one peg,
+        so this is one less than the number of pegs.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "*", "."], [".", ".", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", "."}).heuristic()
+        2
+        """
+        return max(sum([row.count("*") for row in self._marker]) - 1, 0)
+
     def is_solved(self):
         """
         Return True if and only if GridPegSolitairePuzzle self is solved.
@@ -230,6 +390,463 @@ class GridPegSolitairePuzzle(Puzzle):
                     count += 1
         return count == 1
 
+    def fail_fast(self):
+        """
+        Return True if GridPegSolitairePuzzle self has two or more pegs that
+        can never be jumped over or jump again, as described in
+        BitboardPegSolitairePuzzle.fail_fast.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: bool
+
+        >>> grid = [["*", ".", "."], [".", ".", "."], [".", ".", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", "."}).fail_fast()
+        True
+        >>> grid[0][1] = "*"
+        >>> GridPegSolitairePuzzle(grid, {"*", "."}).fail_fast()
+        False
+        """
+        return self.to_bitboard().fail_fast()
+
+    def canonical_key(self):
+        """
+        Return the smallest state_key of any rotation or reflection of
+        GridPegSolitairePuzzle self that leaves its unused cells in place,
+        so that symmetric boards share a key.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid1 = [["*", ".", "."], [".", ".", "."], [".", ".", "."]]
+        >>> grid2 = [[".", ".", "."], [".", ".", "."], [".", ".", "*"]]
+        >>> gpsp1 = GridPegSolitairePuzzle(grid1, {"*", "."})
+        >>> gpsp2 = GridPegSolitairePuzzle(grid2, {"*", "."})
+        >>> gpsp1.canonical_key() == gpsp2.canonical_key()
+        True
+        """
+        return self.to_bitboard().canonical_key()
+
+    def to_bitboard(self):
+        """
+        Return the BitboardPegSolitairePuzzle with the same board as
+        GridPegSolitairePuzzle self.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: BitboardPegSolitairePuzzle
+
+        >>> grid = [["*", "*", "."], ["#", ".", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> gpsp.to_bitboard().to_grid() == gpsp
+        True
+        """
+        return BitboardPegSolitairePuzzle(self._marker, self._marker_set)
+
+
+class BitboardPegSolitairePuzzle(Puzzle):
+    """
+    Peg solitaire on a rectangular grid, like GridPegSolitairePuzzle, with
+    the pegs held as the bits of an int: bit (row * width + column) is set
+    for every peg.  Jumps are checked and made with masks precomputed once
+    for each layout of unused cells.
+    """
+
+    def __init__(self, marker, marker_set):
+        """
+        Create a new BitboardPegSolitairePuzzle self with the board given by
+        marker and marker_set, as for GridPegSolitairePuzzle.
+
+        @type self: BitboardPegSolitairePuzzle
+        @type marker: list[list[str]]
+        @type marker_set: set[str]
+                          "#" for unused, "*" for peg, "." for empty
+        @rtype: None
+        """
+        assert len(marker) > 0
+        assert all([len(x) == len(marker[0]) for x in marker[1:]])
+        assert all([all(x in marker_set for x in row) for row in marker])
+        assert all([x == "*" or x == "." or x == "#" for x in marker_set])
+        self._pegs, unused, bit = 0, 0, 1
+        for row in marker:
+            for cell in row:
+                if cell == "*":
+                    self._pegs |= bit
+                elif cell == "#":
+                    unused |= bit
+                bit <<= 1
+        self._layout = _layout(len(marker), len(marker[0]), unused)
+        self._marker_set = marker_set
+
+    def __eq__(self, other):
+        """
+        Return whether BitboardPegSolitairePuzzle self is equivalent to other.
+
+        @type self: BitboardPegSolitairePuzzle
+        @type other: BitboardPegSolitairePuzzle | Any
+        @rtype: bool
+
+        >>> grid = [["*", "*", "."], ["#", ".", "*"]]
+        >>> b1 = BitboardPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> b2 = BitboardPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> b1 == b2, b1 == b1.extensions()[0]
+        (True, False)
+        """
+        return (type(self) == type(other) and self._pegs == other._pegs and
+                self._layout[:3] == other._layout[:3] and
+                self._marker_set == other._marker_set)
+
+    def __hash__(self):
+        """
+        Return a hash of BitboardPegSolitairePuzzle self consistent with
+        __eq__.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: int
+        """
+        return hash(self._pegs)
+
+    def state_key(self):
+        """
+        Return the pegs of BitboardPegSolitairePuzzle self, which is the
+        same key GridPegSolitairePuzzle.state_key gives for the board.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", ".", "#"], [".", ".", "*"]]
+        >>> BitboardPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key()
+        33
+        """
+        return self._pegs
+
+    def __str__(self):
+        """
+        Return a user friendly representation of BitboardPegSolitairePuzzle
+        self.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: str
+
+        >>> grid = [["*", ".", "#"], [".", ".", "*"]]
+        >>> print(BitboardPegSolitairePuzzle(grid, {"*", ".", "#"}))
+        * . #
+        . . *
+        """
+        return "\n".join([" ".join(row) for row in self.marker()])
+
+    def marker(self):
+        """
+        Return the board of BitboardPegSolitairePuzzle self as a grid of
+        markers, as used by GridPegSolitairePuzzle.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: list[list[str]]
+
+        >>> grid = [["*", ".", "#"], [".", ".", "*"]]
+        >>> BitboardPegSolitairePuzzle(grid, {"*", ".", "#"}).marker() == grid
+        True
+        """
+        rows, cols, unused = self._layout[:3]
+        marker = []
+        for i in range(rows):
+            row = []
+            for j in range(cols):
+                bit = 1 << (i * cols + j)
+                if self._pegs & bit:
+                    row.append("*")
+                elif unused & bit:
+                    row.append("#")
+                else:
+                    row.append(".")
+            marker.append(row)
+        return marker
+
+    def to_grid(self):
+        """
+        Return the GridPegSolitairePuzzle with the same board as
+        BitboardPegSolitairePuzzle self.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: GridPegSolitairePuzzle
+        """
+        return GridPegSolitairePuzzle(self.marker(), self._marker_set)
+
+    def extensions(self):
+        """
+        Return all possible configurations that can be reached by making a
+        single jump from BitboardPegSolitairePuzzle self, in the same order
+        as GridPegSolitairePuzzle.extensions.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: list[BitboardPegSolitairePuzzle]
+
+        >>> grid = [["*", "*", "*", "*", "*"], \
+                    ["*", "*", "*", ".", "*"], \
+                    ["*", "*", "*", "*", "*"], \
+                    ["*", "*", ".", "*", "*"], \
+                    [".", "*", "*", "*", "*"]]
+        >>> b = BitboardPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> len(b.extensions())
+        7
+        """
+        pegs = self._pegs
+        return [self._jump(pegs ^ changed) for jumped, changed
+                in self._layout[3]
+                if pegs & changed == jumped]
+
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of BitboardPegSolitairePuzzle
+        self in the same order, each only when it is asked for.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: iterator[BitboardPegSolitairePuzzle]
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> b = BitboardPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> list(b.iter_extensions()) == b.extensions()
+        True
+        """
+        pegs = self._pegs
+        for jumped, changed in self._layout[3]:
+            if pegs & changed == jumped:
+                yield self._jump(pegs ^ changed)
+
+    def legal_moves(self):
+        """
+        Return the moves of BitboardPegSolitairePuzzle self for apply, one
+        for each of its extensions and in the same order: the bits of the
+        three cells each jump changes.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: list[int]
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> len(BitboardPegSolitairePuzzle(grid, {"*", "."}).legal_moves())
+        2
+        """
+        pegs = self._pegs
+        return [changed for jumped, changed in self._layout[3]
+                if pegs & changed == jumped]
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on BitboardPegSolitairePuzzle self in
+        place, so that it becomes the matching extension.
+
+        This changes the peg mask that __hash__ reads, so self must not be
+        a set member or dict key while it is moved.
+
+        @type self: BitboardPegSolitairePuzzle
+        @type move: int
+        @rtype: None
+
+        >>> grid = [["*", "*", "."], [".", "*", "*"]]
+        >>> b = BitboardPegSolitairePuzzle(grid, {"*", "."})
+        >>> move = b.legal_moves()[0]
+        >>> b.apply(move)
+        >>> print(b)
+        . . *
+        . * *
+        >>> b.undo(move)
+        >>> print(b)
+        * * .
+        . * *
+        """
+        self._pegs ^= move
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to BitboardPegSolitairePuzzle
+        self.
+
+        @type self: BitboardPegSolitairePuzzle
+        @type move: int
+        @rtype: None
+        """
+        self._pegs ^= move
+
+    def canonical_key(self):
+        """
+        Return the smallest state_key of any rotation or reflection of
+        BitboardPegSolitairePuzzle self that leaves its unused cells in
+        place, so that symmetric boards share a key.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid1 = [["#", "*", "."], [".", ".", "."], [".", ".", "#"]]
+        >>> grid2 = [["#", ".", "."], [".", ".", "*"], [".", ".", "#"]]
+        >>> b1 = BitboardPegSolitairePuzzle(grid1, {"*", ".", "#"})
+        >>> b2 = BitboardPegSolitairePuzzle(grid2, {"*", ".", "#"})
+        >>> b1.canonical_key() == b2.canonical_key()
+        True
+        """
+        pegs = best = self._pegs
+        for tables in self._layout[4]:
+            image = 0
+            for k in range(len(tables)):
+                image |= tables[k][(pegs >> (8 * k)) & 255]
+            if image < best:
+                best = image
+        return best
+
+    def fail_fast(self):
+        """
+        Return True if BitboardPegSolitairePuzzle self has two or more
+        stranded pegs, so that it can not be solved.
+
+        A jump moves a peg two cells along a row or column, so pegs never
+        leave the class of cells with the same row and column parity.  Once
+        a class has no pegs, its cells stay empty for good, and a peg whose
+        neighbouring cells are all unusable or in such classes can never be
+        jumped over or jump again.  Only one such peg can be left at the end.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: bool
+
+        >>> grid = [["*", ".", "."], [".", ".", "."], [".", ".", "*"]]
+        >>> BitboardPegSolitairePuzzle(grid, {"*", "."}).fail_fast()
+        True
+        >>> grid[0][1] = "*"
+        >>> BitboardPegSolitairePuzzle(grid, {"*", "."}).fail_fast()
+        False
+        """
+        pegs = self._pegs
+        classes, stranded = self._layout[5]
+        occupied = 0
+        for k in range(4):
+            if pegs & classes[k]:
+                occupied |= 1 << k
+        stuck = pegs & stranded[occupied]
+        # at least two bits set
+        return stuck & (stuck - 1) != 0
+
+    def _jump(self, pegs):
+        # Return the BitboardPegSolitairePuzzle with the layout of self and
+        # pegs.
+        #
+        # @type self: BitboardPegSolitairePuzzle
+        # @type pegs: int
+        # @rtype: BitboardPegSolitairePuzzle
+        puzzle = BitboardPegSolitairePuzzle.__new__(type(self))
+        puzzle._pegs, puzzle._layout = pegs, self._layout
+        puzzle._marker_set = self._marker_set
+        return puzzle
+
+    def heuristic(self):
+        """
+        Return the number of jumps needed to solve BitboardPegSolitairePuzzle
+        self if it can be solved at all, one less than the number of pegs.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: int
+        """
+        return max(bin(self._pegs).count("1") - 1, 0)
+
+    def is_solved(self):
+        """
+        Return True if and only if BitboardPegSolitairePuzzle self is solved.
+
+        @type self: BitboardPegSolitairePuzzle
+        @rtype: bool
+
+        >>> grid = [[".", ".", "."], [".", "*", "#"]]
+        >>> BitboardPegSolitairePuzzle(grid, {"*", ".", "#"}).is_solved()
+        True
+        """
+        # a single set bit is a power of two
+        return self._pegs != 0 and self._pegs & (self._pegs - 1) == 0
+
+
+# layouts shared by BitboardPegSolitairePuzzles, by (rows, cols, unused)
+_LAYOUTS = {}
+
+
+def _layout(rows, cols, unused):
+    # Return (rows, cols, unused, jumps, symmetries, isolation) for a
+    # rows x cols board with the cells in mask unused marked "#".  jumps
+    # lists, for every jump, the mask of the jumping and jumped pegs and the
+    # mask of all three cells involved, which a jump toggles.  They are
+    # ordered like the configurations of GridPegSolitairePuzzle.extensions.
+    # symmetries lists the rotations and reflections of the board that
+    # leave the unused cells in place, other than leaving the board as it
+    # is.  Each is given as one table per byte of the board, mapping the 256
+    # possible values of that byte to the mask they are sent to.  isolation
+    # is (classes, stranded), for fail_fast: classes are the masks of
+    # usable cells by row and column parity, and stranded[k] is the mask of
+    # cells none of whose neighbours are in a class whose bit is set in k.
+    #
+    # @type rows: int
+    # @type cols: int
+    # @type unused: int
+    # @rtype: (int, int, int, list[(int, int)], list[list[list[int]]],
+    #          (list[int], list[int]))
+    if (rows, cols, unused) not in _LAYOUTS:
+        jumps = []
+        for directions in (((0, -1), (0, 1)), ((-1, 0), (1, 0))):
+            for i in range(rows):
+                for j in range(cols):
+                    for di, dj in directions:
+                        cells = [(i + k * di, j + k * dj) for k in range(3)]
+                        if all([0 <= a < rows and 0 <= b < cols and
+                                not unused & (1 << (a * cols + b))
+                                for a, b in cells]):
+                            to, over, start = [1 << (a * cols + b)
+                                               for a, b in cells]
+                            jumps.append((over | start, to | over | start))
+        transforms = [lambda i, j: (i, j),
+                      lambda i, j: (i, cols - 1 - j),
+                      lambda i, j: (rows - 1 - i, j),
+                      lambda i, j: (rows - 1 - i, cols - 1 - j)]
+        if rows == cols:
+            # a square board can also be turned a quarter or flipped
+            # along its diagonals
+            transforms += [lambda i, j: (j, i),
+                           lambda i, j: (j, rows - 1 - i),
+                           lambda i, j: (cols - 1 - j, i),
+                           lambda i, j: (cols - 1 - j, rows - 1 - i)]
+        symmetries = []
+        for transform in transforms[1:]:
+            permutation = []
+            for cell in range(rows * cols):
+                i, j = transform(cell // cols, cell % cols)
+                permutation.append(i * cols + j)
+            if all([bool(unused & (1 << cell)) ==
+                    bool(unused & (1 << permutation[cell]))
+                    for cell in range(rows * cols)]):
+                tables = []
+                for start in range(0, rows * cols, 8):
+                    table = [0]
+                    # each value adds its top bit to the value without it
+                    for value in range(1, 256):
+                        top = value.bit_length() - 1
+                        bit = 0
+                        if start + top < rows * cols:
+                            bit = 1 << permutation[start + top]
+                        table.append(table[value ^ (1 << top)] | bit)
+                    tables.append(table)
+                symmetries.append(tables)
+        classes, neighbours = [0] * 4, []
+        for i in range(rows):
+            for j in range(cols):
+                if not unused & (1 << (i * cols + j)):
+                    classes[i % 2 * 2 + j % 2] |= 1 << (i * cols + j)
+                neighbours.append(0)
+                for a, b in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                    if 0 <= a < rows and 0 <= b < cols:
+                        neighbours[-1] |= 1 << (a * cols + b)
+        stranded = []
+        for k in range(16):
+            reachable = 0
+            for c in range(4):
+                if k & (1 << c):
+                    reachable |= classes[c]
+            stranded.append(sum([1 << cell for cell in range(rows * cols)
+                                 if not neighbours[cell] & reachable]))
+        _LAYOUTS[(rows, cols, unused)] = (rows, cols, unused, jumps,
+                                          symmetries, (classes, stranded))
+    return _LAYOUTS[(rows, cols, unused)]
+
 
 if __name__ == "__main__":
     import doctest
@@ -24,7 +24,34 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        self.to_grid = to_grid
+        # the configuration is kept as a flat sequence of symbol codes, with
+        # the position of "*" cached; from_grid is rebuilt from it on demand.
+        # apply turns bytes into a bytearray, to swap codes in place
+        self._encoding = _encoding(from_grid, to_grid)
+        self._cells = _encode(from_grid, self._encoding[1])
+        self._blank = _find_blank(self._cells, self._encoding)
+        self._grid = from_grid
+
+    @property
+    def from_grid(self):
+        """
+        Return the current configuration of MNPuzzle self as a tuple of rows.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> MNPuzzle(start_grid, target_grid).extensions()[0].from_grid
+        (('2', '*', '3'), ('1', '4', '5'))
+        """
+        if self._grid is None:
+            symbols, m = self._encoding[0], self.m
+            self._grid = tuple([tuple([symbols[code] for code in
+                                       self._cells[i * m:(i + 1) * m]])
+                                for i in range(self.n)])
+        return self._grid
 
     def __eq__(self, other):
         """
@@ -49,9 +76,42 @@ class MNPuzzle(Puzzle):
         True
         """
         return (type(self) == type(other) and
-                self.from_grid == other.from_grid and
+                self._cells == other._cells and
+                self._encoding[0] == other._encoding[0] and
                 self.to_grid == other.to_grid)
 
+    def __hash__(self):
+        """
+        Return a hash of MNPuzzle self consistent with __eq__.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> mnp1 = MNPuzzle(start_grid, target_grid)
+        >>> mnp2 = MNPuzzle(start_grid, target_grid)
+        >>> hash(mnp1) == hash(mnp2)
+        True
+        """
+        return hash((_frozen(self._cells), self.to_grid))
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of MNPuzzle self.
+        Two MNPuzzles working towards the same to_grid have equal keys if
+        and only if they are equal.
+
+        @type self: MNPuzzle
+        @rtype: bytes | tuple[int]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> MNPuzzle(start_grid, target_grid).state_key()
+        b'\\x00\\x02\\x03\\x01\\x04\\x05'
+        """
+        return _frozen(self._cells)
+
     def __str__(self):
         """
         Return a user-friendly representation of MNPuzzle self.
@@ -87,10 +147,26 @@ class MNPuzzle(Puzzle):
         >>> mnp1.index_of_space()
         (0, 0)
         """
-        for i in range(self.n):
-            for j in range(self.m):
-                if self.from_grid[i][j] == "*":
-                    return tuple([i, j])
+        if self._blank is not None:
+            return tuple([self._blank // self.m, self._blank % self.m])
+
+    def positions(self):
+        """
+        Return a dict mapping each symbol of MNPuzzle self to its position,
+        counting along the rows from 0.
+
+        @type self: MNPuzzle
+        @rtype: dict[str, int]
+
+        >>> target_grid1 = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid1 = (("*", "2", "3"), ("1", "4", "5"))
+        >>> mnp1 = MNPuzzle(start_grid1, target_grid1)
+        >>> mnp1.positions()["1"], mnp1.positions()["*"]
+        (3, 0)
+        """
+        symbols = self._encoding[0]
+        return {symbols[self._cells[position]]: position
+                for position in range(len(self._cells))}
 
     def convert_tuple(self):
         """
@@ -140,23 +216,12 @@ class MNPuzzle(Puzzle):
         2 * 3
         1 4 5
         """
-        configurations = []
-        empty_index = self.index_of_space()
-        n_value = empty_index[0]
-        m_value = empty_index[1]
-        if m_value + 1 < self.m:
-            new_grid = self.convert_tuple()
-            new_grid[n_value][m_value] = new_grid[n_value][m_value + 1]
-            new_grid[n_value][m_value + 1] = "*"
-            configurations.append(MNPuzzle(self.convert_list(new_grid),
-                                           self.to_grid))
-        if m_value - 1 >= 0:
-            new_grid = self.convert_tuple()
-            new_grid[n_value][m_value] = new_grid[n_value][m_value - 1]
-            new_grid[n_value][m_value - 1] = "*"
-            configurations.append(MNPuzzle(self.convert_list(new_grid),
-                                           self.to_grid))
-        return configurations
+        if self._blank is None:
+            return []
+        row = self._blank // self.m
+        return [self._slide(target) for target in
+                _slides(self.n, self.m)[self._blank]
+                if target // self.m == row]
 
     def col_configs(self):
         """
@@ -173,23 +238,12 @@ class MNPuzzle(Puzzle):
         1 2 3
         * 4 5
         """
-        configurations = []
-        empty_index = self.index_of_space()
-        n_value = empty_index[0]
-        m_value = empty_index[1]
-        if n_value + 1 < self.n:
-            new_grid = self.convert_tuple()
-            new_grid[n_value][m_value] = new_grid[n_value + 1][m_value]
-            new_grid[n_value + 1][m_value] = "*"
-            configurations.append(MNPuzzle(self.convert_list(new_grid),
-                                           self.to_grid))
-        if n_value - 1 >= 0:
-            new_grid = self.convert_tuple()
-            new_grid[n_value][m_value] = new_grid[n_value - 1][m_value]
-            new_grid[n_value - 1][m_value] = "*"
-            configurations.append(MNPuzzle(self.convert_list(new_grid),
-                                           self.to_grid))
-        return configurations
+        if self._blank is None:
+            return []
+        row = self._blank // self.m
+        return [self._slide(target) for target in
+                _slides(self.n, self.m)[self._blank]
+                if target // self.m != row]
 
     def extensions(self):
         """
@@ -205,7 +259,248 @@ class MNPuzzle(Puzzle):
         >>> len(mnp1.extensions())
         2
         """
-        return self.row_configs() + self.col_configs()
+        if self._blank is None:
+            return []
+        return [self._slide(target) for target in
+                _slides(self.n, self.m)[self._blank]]
+
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of MNPuzzle self in the
+        same order, each only when it is asked for.
+
+        @type self: MNPuzzle
+        @rtype: iterator[MNPuzzle]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> mnp = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> list(mnp.iter_extensions()) == mnp.extensions()
+        True
+        """
+        if self._blank is not None:
+            for target in _slides(self.n, self.m)[self._blank]:
+                yield self._slide(target)
+
+    def legal_moves(self):
+        """
+        Return the moves of MNPuzzle self for apply, one for each of its
+        extensions and in the same order: the position of "*" and the
+        position of the symbol that slides into it.
+
+        @type self: MNPuzzle
+        @rtype: list[(int, int)]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> mnp = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> mnp.legal_moves()
+        [(0, 1), (0, 3)]
+        """
+        if self._blank is None:
+            return []
+        return [(self._blank, target) for target in
+                _slides(self.n, self.m)[self._blank]]
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on MNPuzzle self in place, so that it
+        becomes the matching extension.
+
+        This swaps cells that __hash__ reads, so self must not be a set
+        member or dict key while it is moved.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> mnp = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> move = mnp.legal_moves()[0]
+        >>> mnp.apply(move)
+        >>> print(mnp)
+        2 * 3
+        1 4 5
+        >>> mnp.undo(move)
+        >>> print(mnp)
+        * 2 3
+        1 4 5
+        """
+        self._swap_cells(move[0], move[1])
+        self._blank, self._grid = move[1], None
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to MNPuzzle self.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+        """
+        self._swap_cells(move[0], move[1])
+        self._blank, self._grid = move[0], None
+
+    def _swap_cells(self, i, j):
+        # Swap the codes at flat positions i and j of MNPuzzle self in
+        # place, first turning bytes cells into a bytearray.
+        #
+        # @type self: MNPuzzle
+        # @type i: int
+        # @type j: int
+        # @rtype: None
+        cells = self._cells
+        if type(cells) is tuple:
+            self._cells = _swap(cells, i, j)
+        else:
+            if type(cells) is bytes:
+                cells = self._cells = bytearray(cells)
+            cells[i], cells[j] = cells[j], cells[i]
+
+    def _slide(self, target):
+        # Return the MNPuzzle obtained by sliding the symbol at flat
+        # position target into the empty space of MNPuzzle self.
+        #
+        # @type self: MNPuzzle
+        # @type target: int
+        # @rtype: MNPuzzle
+        puzzle = MNPuzzle.__new__(type(self))
+        puzzle.n, puzzle.m, puzzle.to_grid = self.n, self.m, self.to_grid
+        puzzle._encoding, puzzle._blank, puzzle._grid = (self._encoding,
+                                                         target, None)
+        puzzle._cells = _swap(_frozen(self._cells), self._blank, target)
+        return puzzle
+
+    def goal_state(self):
+        """
+        Return the solved configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> print(MNPuzzle(start_grid, target_grid).goal_state())
+        1 2 3
+        4 5 *
+        """
+        return MNPuzzle(self.to_grid, self.to_grid)
+
+    def reverse_extensions(self):
+        """
+        Return the configurations that have MNPuzzle self as an extension.
+        Every slide can be undone by sliding back, so these are the same
+        as the extensions of self.
+
+        @type self: MNPuzzle
+        @rtype: list[MNPuzzle]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> len(MNPuzzle(start_grid, target_grid).reverse_extensions())
+        2
+        """
+        return self.extensions()
+
+    def heuristic(self):
+        """
+        Return a lower bound on the number of moves needed to turn from_grid
+        into to_grid: the Manhattan distance of every symbol other than "*"
+        from its place in to_grid, plus two moves for every symbol that has
+        to leave its row or column to get past another symbol bound for the
+        same row or column (linear conflict).  A symbol with several places
+        in to_grid counts the distance to the nearest of them, and is left
+        out of linear conflicts.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> target_grid1 = (("1", "2", "3"), ("4", "5", "*"))
+        >>> start_grid1 = (("*", "2", "3"), ("1", "4", "5"))
+        >>> MNPuzzle(start_grid1, target_grid1).heuristic()
+        3
+        >>> start_grid2 = (("2", "1", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(start_grid2, target_grid1).heuristic()
+        4
+        >>> target_grid3 = (("1", "1", "2"), ("*", "1", "2"))
+        >>> start_grid3 = (("1", "1", "2"), ("1", "2", "*"))
+        >>> MNPuzzle(start_grid3, target_grid3).heuristic()
+        2
+        >>> MNPuzzle(target_grid3, target_grid3).heuristic()
+        0
+        """
+        goal, blank, m = self._encoding[3], self._blank, self.m
+        distance = 0
+        rows = [[] for _ in range(self.n)]
+        cols = [[] for _ in range(self.m)]
+        for position in range(len(self._cells)):
+            places = goal[self._cells[position]]
+            if position == blank or len(places) == 0:
+                continue
+            i, j = position // m, position % m
+            if len(places) > 1:
+                distance += min([abs(goal_i - i) + abs(goal_j - j)
+                                 for goal_i, goal_j in places])
+                continue
+            goal_i, goal_j = places[0]
+            distance += abs(goal_i - i) + abs(goal_j - j)
+            if goal_i == i:
+                rows[i].append(goal_j)
+            if goal_j == j:
+                cols[j].append(goal_i)
+        for line in rows + cols:
+            distance += 2 * (len(line) - _longest_increasing(line))
+        return distance
+
+    def is_solvable(self):
+        """
+        Return True if and only if to_grid can be reached from the current
+        configuration of MNPuzzle self.
+
+        Every slide swaps "*" with a neighbour, changing both the parity of
+        the permutation taking the current configuration to to_grid and the
+        parity of the distance of "*" from its place in to_grid.  So these
+        parities must agree, which on grids at least 2x2 is also enough (the
+        usual count of inversions plus the row distance of "*" is a special
+        case of this).  On a single row or column, symbols can never pass
+        each other.
+
+        @type self: MNPuzzle
+        @rtype: bool
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+        ...          target_grid).is_solvable()
+        True
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+        ...          target_grid).is_solvable()
+        False
+        """
+        cells, goal = self._cells, self._encoding[2]
+        if sorted(cells) != sorted(goal):
+            return False
+        if self._blank is None:
+            return cells == goal
+        if self.n == 1 or self.m == 1:
+            blank = cells[self._blank]
+            return ([code for code in cells if code != blank] ==
+                    [code for code in goal if code != blank])
+        if len(set(goal)) < len(goal):
+            # swapping two equal symbols fixes the parity of any permutation
+            return True
+        places = {goal[position]: position for position in range(len(goal))}
+        permutation = [places[code] for code in cells]
+        # a permutation is odd exactly when it has an odd number of
+        # even-length cycles, i.e. when size - cycles is odd
+        swaps, seen = len(permutation), [False] * len(permutation)
+        for start in range(len(permutation)):
+            if not seen[start]:
+                swaps -= 1
+                position = start
+                while not seen[position]:
+                    seen[position] = True
+                    position = permutation[position]
+        goal_blank = places[cells[self._blank]]
+        distance = (abs(goal_blank // self.m - self._blank // self.m) +
+                    abs(goal_blank % self.m - self._blank % self.m))
+        return swaps % 2 == distance % 2
 
     def is_solved(self):
         """
@@ -226,7 +521,121 @@ class MNPuzzle(Puzzle):
         >>> mnp2.is_solved()
         True
         """
-        return self.from_grid == self.to_grid
+        return self._cells == self._encoding[2]
+
+
+# encodings shared by all MNPuzzles over the same symbols and to_grid, each
+# (symbols in code order, code of each symbol, to_grid encoded,
+#  (row, column) places in to_grid of each code)
+_ENCODINGS = {}
+
+
+def _encoding(from_grid, to_grid):
+    # Return the encoding for MNPuzzles going from from_grid to to_grid.
+    #
+    # @type from_grid: tuple[tuple[str]]
+    # @type to_grid: tuple[tuple[str]]
+    # @rtype: (tuple[str], dict[str, int], bytes | tuple[int],
+    #          list[list[(int, int)]])
+    symbols = tuple(sorted(set([symbol for grid in (from_grid, to_grid)
+                                for row in grid for symbol in row])))
+    if (symbols, to_grid) not in _ENCODINGS:
+        codes = {symbols[i]: i for i in range(len(symbols))}
+        places = [[] for _ in symbols]
+        for i in range(len(to_grid)):
+            for j in range(len(to_grid[i])):
+                places[codes[to_grid[i][j]]].append((i, j))
+        _ENCODINGS[(symbols, to_grid)] = (symbols, codes,
+                                          _encode(to_grid, codes), places)
+    return _ENCODINGS[(symbols, to_grid)]
+
+
+def _encode(grid, codes):
+    # Return grid flattened row by row into codes: bytes when every code
+    # fits in one, otherwise a tuple.
+    #
+    # @type grid: tuple[tuple[str]]
+    # @type codes: dict[str, int]
+    # @rtype: bytes | tuple[int]
+    cells = [codes[symbol] for row in grid for symbol in row]
+    if len(codes) <= 256:
+        return bytes(cells)
+    return tuple(cells)
+
+
+def _swap(cells, i, j):
+    # Return cells with the codes at flat positions i and j swapped.
+    #
+    # @type cells: bytes | tuple[int]
+    # @type i: int
+    # @type j: int
+    # @rtype: bytes | tuple[int]
+    first, last = min(i, j), max(i, j)
+    return (cells[:first] + cells[last:last + 1] + cells[first + 1:last] +
+            cells[first:first + 1] + cells[last + 1:])
+
+
+def _frozen(cells):
+    # Return cells as bytes if apply has made it a bytearray, otherwise
+    # unchanged.
+    #
+    # @type cells: bytes | bytearray | tuple[int]
+    # @rtype: bytes | tuple[int]
+    if type(cells) is bytearray:
+        return bytes(cells)
+    return cells
+
+
+def _find_blank(cells, encoding):
+    # Return the flat position of "*" in cells, or None if there is none.
+    #
+    # @type cells: bytes | tuple[int]
+    # @type encoding: tuple
+    # @rtype: int | None
+    if "*" not in encoding[1]:
+        return None
+    blank = encoding[1]["*"]
+    for position in range(len(cells)):
+        if cells[position] == blank:
+            return position
+    return None
+
+
+# positions that can slide into the empty space, for each position of the
+# empty space, in each shape of grid seen so far
+_SLIDES = {}
+
+
+def _slides(n, m):
+    # Return, for each flat position of the empty space in an nxm grid,
+    # the flat positions right of, left of, below and above it that are on
+    # the grid, in that order.
+    #
+    # @type n: int
+    # @type m: int
+    # @rtype: list[list[int]]
+    if (n, m) not in _SLIDES:
+        table = []
+        for position in range(n * m):
+            i, j = position // m, position % m
+            table.append([i * m + j + 1] * (j + 1 < m) +
+                         [i * m + j - 1] * (j > 0) +
+                         [(i + 1) * m + j] * (i + 1 < n) +
+                         [(i - 1) * m + j] * (i > 0))
+        _SLIDES[(n, m)] = table
+    return _SLIDES[(n, m)]
+
+
+def _longest_increasing(line):
+    # Return the length of the longest increasing subsequence of line.
+    #
+    # @type line: list[int]
+    # @rtype: int
+    lengths = []
+    for i in range(len(line)):
+        lengths.append(1 + max([lengths[j] for j in range(i)
+                                if line[j] < line[i]] + [0]))
+    return max(lengths + [0])
 
 
 if __name__ == "__main__":
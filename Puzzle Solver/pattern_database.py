@@ -0,0 +1,305 @@
+"""
+Disjoint additive pattern databases for MNPuzzle.
+
+A pattern database records, for every placement of a few symbols (the
+pattern), the number of moves of those symbols needed to bring them to
+their places in to_grid, whatever happens to the other symbols.  When the
+patterns share no symbols, these counts may be added together and still
+never overestimate the moves needed, giving a heuristic much stronger than
+Manhattan distance for astar_solve and ida_star_solve.
+"""
+from hashlib import sha1
+import json
+import mmap
+import os
+import struct
+
+_MAGIC = b"MNPDB001"
+_HEADER = struct.Struct("=8sI")
+
+
+class PatternDatabase:
+    """
+    The number of moves of the symbols in pattern needed to bring them from
+    each placement to their places in to_grid.
+    """
+
+    def __init__(self, to_grid, pattern, table):
+        """
+        Create a new PatternDatabase self for pattern in to_grid, with the
+        count for each placement of pattern at its rank in table.
+
+        @type self: PatternDatabase
+        @type to_grid: tuple[tuple[str]]
+        @type pattern: tuple[str]
+        @type table: bytearray | memoryview
+        @rtype: None
+        """
+        self.to_grid, self.pattern, self.table = to_grid, pattern, table
+        self._size = len(to_grid) * len(to_grid[0])
+
+    def cost(self, positions):
+        """
+        Return the number of moves of the pattern symbols needed to bring
+        them to their places, where positions maps each symbol to its flat
+        position in the grid.
+
+        @type self: PatternDatabase
+        @type positions: dict[str, int]
+        @rtype: int
+        """
+        return self.table[_rank([positions[symbol] for symbol in
+                                 self.pattern], self._size)]
+
+    def save(self, path):
+        """
+        Write PatternDatabase self to the file at path, for
+        load_pattern_database.
+
+        @type self: PatternDatabase
+        @type path: str
+        @rtype: None
+        """
+        meta = json.dumps({"to_grid": self.to_grid,
+                           "pattern": self.pattern}).encode("utf-8")
+        meta += b" " * (-(_HEADER.size + len(meta)) % 8)
+        # write next to path and rename, so other processes never see a
+        # partly written table
+        partial = "{}.{}.tmp".format(path, os.getpid())
+        with open(partial, "wb") as table_file:
+            table_file.write(_HEADER.pack(_MAGIC, len(meta)))
+            table_file.write(meta)
+            table_file.write(self.table)
+        os.replace(partial, path)
+
+
+class AdditiveHeuristic:
+    """
+    A heuristic for MNPuzzles summing the costs of disjoint pattern
+    databases over the same to_grid.
+    """
+
+    def __init__(self, databases):
+        """
+        Create a new AdditiveHeuristic self adding up databases, whose
+        patterns must not share symbols.
+
+        @type self: AdditiveHeuristic
+        @type databases: list[PatternDatabase]
+        @rtype: None
+        """
+        symbols = [symbol for database in databases
+                   for symbol in database.pattern]
+        assert len(symbols) == len(set(symbols))
+        self.databases = databases
+
+    def __call__(self, puzzle):
+        """
+        Return a lower bound on the number of moves needed to solve the
+        MNPuzzle puzzle.
+
+        @type self: AdditiveHeuristic
+        @type puzzle: MNPuzzle
+        @rtype: int
+        """
+        positions = puzzle.positions()
+        return sum([database.cost(positions) for database in self.databases])
+
+
+def default_patterns(to_grid, size=6):
+    """
+    Return the symbols of to_grid other than "*", in row order, split into
+    patterns of at most size symbols: 6-6-3 for the 15-puzzle.
+
+    @type to_grid: tuple[tuple[str]]
+    @type size: int
+    @rtype: list[tuple[str]]
+
+    >>> default_patterns((("1", "2", "3"), ("4", "5", "*")), 2)
+    [('1', '2'), ('3', '4'), ('5',)]
+    """
+    symbols = [symbol for row in to_grid for symbol in row if symbol != "*"]
+    return [tuple(symbols[i:i + size]) for i in range(0, len(symbols), size)]
+
+
+def build_pattern_database(to_grid, pattern):
+    """
+    Return the PatternDatabase for pattern in to_grid, found by
+    breadth-first search backwards from to_grid.
+
+    The other symbols are indistinguishable, and sliding one of them costs
+    nothing, so a search state is the placement of pattern together with
+    the region of cells not covered by pattern in which "*" can move freely.
+
+    @type to_grid: tuple[tuple[str]]
+    @type pattern: tuple[str]
+    @rtype: PatternDatabase
+
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> database = build_pattern_database(target_grid, ("1", "2"))
+    >>> database.cost({"1": 0, "2": 1})
+    0
+    >>> database.cost({"1": 1, "2": 0})
+    6
+    """
+    n, m = len(to_grid), len(to_grid[0])
+    size = n * m
+    flat = [symbol for row in to_grid for symbol in row]
+    assert all([flat.count(symbol) == 1 for symbol in pattern + ("*",)])
+    neighbours = [[j for j in (i - m, i + m) if 0 <= j < size] +
+                  [j for j in (i - 1, i + 1) if j // m == i // m]
+                  for i in range(size)]
+    table = bytearray(b"\xff") * _table_size(len(pattern), size)
+    # one bit per (placement, cell of the free region containing "*")
+    reached = bytearray(len(table) * size // 8 + 1)
+    start = tuple([flat.index(symbol) for symbol in pattern])
+    table[_rank(start, size)] = 0
+    layer, cost = [(start, flat.index("*"))], 0
+    _mark(reached, _rank(start, size) * size +
+          min(_region(start, flat.index("*"), neighbours)))
+    while len(layer) != 0:
+        next_layer, cost = [], cost + 1
+        for positions, blank in layer:
+            region = _region(positions, blank, neighbours)
+            for k in range(len(positions)):
+                for cell in neighbours[positions[k]]:
+                    if cell in region:
+                        # slide pattern symbol k into the free cell, leaving
+                        # "*" where it was
+                        moved = positions[:k] + (cell,) + positions[k + 1:]
+                        rank = _rank(moved, size)
+                        key = rank * size + min(_region(moved, positions[k],
+                                                        neighbours))
+                        if not _marked(reached, key):
+                            _mark(reached, key)
+                            if table[rank] == 255:
+                                table[rank] = min(cost, 254)
+                            next_layer.append((moved, positions[k]))
+        layer = next_layer
+    return PatternDatabase(to_grid, tuple(pattern), table)
+
+
+def load_pattern_database(path):
+    """
+    Return the PatternDatabase saved at path, with its table read through
+    mmap rather than loaded into memory.
+
+    @type path: str
+    @rtype: PatternDatabase
+    """
+    with open(path, "rb") as table_file:
+        contents = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, meta_size = _HEADER.unpack_from(contents)
+    assert magic == _MAGIC
+    meta = json.loads(contents[_HEADER.size:_HEADER.size + meta_size]
+                      .decode("utf-8"))
+    to_grid = tuple([tuple(row) for row in meta["to_grid"]])
+    return PatternDatabase(to_grid, tuple(meta["pattern"]),
+                           memoryview(contents)[_HEADER.size + meta_size:])
+
+
+def pattern_heuristic(to_grid, patterns=None, directory=None):
+    """
+    Return an AdditiveHeuristic for to_grid over patterns (default_patterns
+    if None).  If directory is given, each database is loaded from it if it
+    was saved there before, and built and saved there otherwise.
+
+    @type to_grid: tuple[tuple[str]]
+    @type patterns: list[tuple[str]] | None
+    @type directory: str | None
+    @rtype: AdditiveHeuristic
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> heuristic = pattern_heuristic(target_grid, [("1", "2", "3"),
+    ...                                             ("4", "5")])
+    >>> heuristic(MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid))
+    3
+    """
+    if patterns is None:
+        patterns = default_patterns(to_grid)
+    databases = []
+    for pattern in patterns:
+        pattern = tuple(pattern)
+        if directory is None:
+            databases.append(build_pattern_database(to_grid, pattern))
+            continue
+        digest = sha1(json.dumps([to_grid, pattern]).encode("utf-8"))
+        path = os.path.join(directory, digest.hexdigest() + ".pdb")
+        if not os.path.exists(path):
+            build_pattern_database(to_grid, pattern).save(path)
+        databases.append(load_pattern_database(path))
+    return AdditiveHeuristic(databases)
+
+
+def _table_size(k, size):
+    """
+    Return the number of placements of k distinct symbols on size cells.
+
+    @type k: int
+    @type size: int
+    @rtype: int
+    """
+    total = 1
+    for i in range(k):
+        total *= size - i
+    return total
+
+
+def _rank(positions, size):
+    """
+    Return the index of placement positions among all placements of
+    len(positions) distinct symbols on size cells.
+
+    @type positions: list[int] | tuple[int]
+    @type size: int
+    @rtype: int
+
+    >>> _rank((0, 1), 3), _rank((2, 1), 3)
+    (0, 5)
+    """
+    rank = 0
+    for i in range(len(positions)):
+        earlier = len([p for p in positions[:i] if p < positions[i]])
+        rank = rank * (size - i) + positions[i] - earlier
+    return rank
+
+
+def _region(positions, blank, neighbours):
+    """
+    Return the set of cells not in positions that "*" can reach from blank.
+
+    @type positions: tuple[int]
+    @type blank: int
+    @type neighbours: list[list[int]]
+    @rtype: set[int]
+    """
+    region, stack = {blank}, [blank]
+    while len(stack) != 0:
+        for cell in neighbours[stack.pop()]:
+            if cell not in region and cell not in positions:
+                region.add(cell)
+                stack.append(cell)
+    return region
+
+
+def _mark(bits, i):
+    """
+    Set bit i of bits.
+
+    @type bits: bytearray
+    @type i: int
+    @rtype: None
+    """
+    bits[i >> 3] |= 1 << (i & 7)
+
+
+def _marked(bits, i):
+    """
+    Return whether bit i of bits is set.
+
+    @type bits: bytearray
+    @type i: int
+    @rtype: bool
+    """
+    return bits[i >> 3] & (1 << (i & 7)) != 0
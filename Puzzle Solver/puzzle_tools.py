@@ -2,14 +2,17 @@
 Some functions for working with puzzles
 """
 from puzzle import Puzzle
+from array import array
 from collections import deque
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
-# you may uncomment the next lines on a unix system such as CDF
-# import resource
-# resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
-import sys
-sys.setrecursionlimit(10**6)
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from heapq import heappush, heappop
+from itertools import count
+from operator import methodcaller
+import io
+import multiprocessing
+import os
+import pickle
+import time
 # TODO
 # implement depth_first_solve
 # do NOT change the type contract
@@ -33,64 +36,1892 @@ def get_parent(bottom_node):
     return bottom_node
 
 
-def depth_first_solve(puzzle):
+def write_path(node, out):
+    """
+    Write to the file object out the same text as str(node), a piece at a
+    time, so that long paths are never built into one string.
+
+    @type node: PuzzleNode
+    @type out: io.TextIOBase
+    @rtype: None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> path = depth_first_solve(WordLadderPuzzle("cat", "cog",
+    ...                                           {"cat", "cot", "cog"}))
+    >>> out = io.StringIO()
+    >>> write_path(path, out)
+    >>> out.getvalue() == str(path)
+    True
+    """
+    for chunk in _render(node):
+        out.write(chunk)
+
+
+def _render(node):
+    """
+    Yield the pieces of the text of str(node) in order: each configuration
+    below node, depth-first, followed by a blank line, with a newline
+    between the subtrees of siblings.
+
+    @type node: PuzzleNode
+    @rtype: iterator[str]
+    """
+    pending = [node]
+    while len(pending) != 0:
+        item = pending.pop()
+        if isinstance(item, str):
+            yield item
+            continue
+        yield str(item.puzzle)
+        yield "\n\n"
+        # the first child is popped, and so written, first
+        for i in range(len(item.children) - 1, -1, -1):
+            pending.append(item.children[i])
+            if i != 0:
+                pending.append("\n")
+
+
+def state_key(puzzle):
+    """
+    Return a compact hashable key identifying the configuration of puzzle,
+    for use in the visited sets of the solvers.  Puzzles that provide a
+    state_key method are keyed on it; any other puzzle falls back to its
+    string representation.
+
+    @type puzzle: Puzzle
+    @rtype: object
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> state_key(WordLadderPuzzle("same", "cost", {"same", "cost"}))
+    'same'
+    """
+    key = getattr(puzzle, "state_key", None)
+    if key is None:
+        return str(puzzle)
+    return key()
+
+
+def is_solvable(puzzle):
+    """
+    Return False if puzzle can cheaply be shown to have no solution, by its
+    is_solvable method, and True otherwise.  The solvers return None at
+    once for such puzzles instead of exhausting their search space.
+
+    @type puzzle: Puzzle
+    @rtype: bool
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+    >>> is_solvable(MNPuzzle(start_grid, target_grid))
+    False
+    >>> breadth_first_solve(MNPuzzle(start_grid, target_grid)) is None
+    True
+    """
+    check = getattr(puzzle, "is_solvable", None)
+    return check is None or check()
+
+
+def canonical_key(puzzle):
+    """
+    Return a key identifying the configuration of puzzle up to the
+    symmetries of the puzzle, so that configurations that are rotations or
+    reflections of each other share it.  Puzzles without a canonical_key
+    method are keyed as by state_key.
+
+    @type puzzle: Puzzle
+    @rtype: object
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> gpsp1 = GridPegSolitairePuzzle([["*", "."], [".", "."]], {"*", "."})
+    >>> gpsp2 = GridPegSolitairePuzzle([[".", "."], [".", "*"]], {"*", "."})
+    >>> canonical_key(gpsp1) == canonical_key(gpsp2)
+    True
+    """
+    key = getattr(puzzle, "canonical_key", None)
+    if key is None:
+        return state_key(puzzle)
+    return key()
+
+
+def iter_extensions(puzzle):
+    """
+    Return an iterator over the extensions of puzzle, in the order its
+    extensions method gives them.  Puzzles that provide an
+    iter_extensions method make each extension only when it is asked for;
+    any other puzzle falls back to the list from extensions.
+
+    @type puzzle: Puzzle
+    @rtype: iterator[Puzzle]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cut"}
+    >>> sorted([str(config) for config in
+    ...         iter_extensions(WordLadderPuzzle("cat", "cut", ws))])
+    ['cot -> cut', 'cut -> cut']
+    """
+    lazy = getattr(puzzle, "iter_extensions", None)
+    if lazy is None:
+        return iter(puzzle.extensions())
+    return lazy()
+
+
+def depth_first_solve(puzzle, check_on_push=False, stats=None,
+                      symmetry=False, table=None, stop=None, budget=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    If check_on_push is True, extensions that have already been visited or
+    are already waiting in the frontier are dropped before a PuzzleNode is
+    created for them, rather than after they are popped.  The number of
+    dropped duplicates is recorded in stats, if given.
+
+    If symmetry is True, configurations are deduplicated by canonical_key,
+    so only one of each set of symmetric configurations is explored.  If a
+    TranspositionTable table is given, configurations it records as dead
+    are not explored, and those this search proves dead are added to it.
+
+    Configurations whose fail_fast method returns True are not extended;
+    their number is recorded in stats, if given.  If stop is given, it is
+    called every few hundred configurations, and the search gives up and
+    returns None once it returns True.
+
+    If a SearchBudget budget is given and the search runs out of it before
+    it is over, an IncompleteSearch is returned instead, from which the
+    search can be carried on by resume_search.
+
     @type puzzle: Puzzle
-    @rtype: PuzzleNode
+    @type check_on_push: bool
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type table: TranspositionTable | None
+    @type stop: () -> bool | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | IncompleteSearch | None
     """
-    extensions = deque()
-    extensions.append(PuzzleNode(puzzle))
-    done = False
-    configuration = PuzzleNode()
-    visited = set()
-    while len(extensions) != 0 and not done:
-        configuration = extensions.pop()
-        if str(configuration.puzzle) not in visited:
-            if configuration.puzzle.is_solved():
-                done = True
-            else:
-                configs = configuration.puzzle.extensions()
-                for i in range(len(configs)-1, -1, -1):
-                    extensions.append(PuzzleNode(configs[i],
-                                                 parent=configuration))
-            visited.add(str(configuration.puzzle))
-    if done:
-        return get_parent(configuration)
-    else:
-        return None
+    return _search(puzzle, False, check_on_push, stats, symmetry, table,
+                   stop, budget)
 
 
-def breadth_first_solve(puzzle):
+def breadth_first_solve(puzzle, check_on_push=False, stats=None,
+                        symmetry=False, stop=None, budget=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    If check_on_push is True, extensions that have already been visited or
+    are already waiting in the frontier are dropped before a PuzzleNode is
+    created for them, rather than after they are popped.  The number of
+    dropped duplicates is recorded in stats, if given.  If symmetry is
+    True, configurations are deduplicated by canonical_key.  As in
+    depth_first_solve, configurations whose fail_fast method returns True
+    are not extended, stop may end the search early, and a search that
+    runs out of budget returns an IncompleteSearch.
+
     @type puzzle: Puzzle
-    @rtype: PuzzleNode
+    @type check_on_push: bool
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type stop: () -> bool | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | IncompleteSearch | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cag"}
+    >>> stats = SearchStats()
+    >>> path = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws),
+    ...                            check_on_push=True, stats=stats)
+    >>> print(path.children[0].children[0].children[0].puzzle)
+    dog -> dog
+    >>> stats.duplicates
+    5
+    """
+    return _search(puzzle, True, check_on_push, stats, symmetry, None, stop,
+                   budget)
+
+
+def _search(puzzle, breadth_first, check_on_push, stats, symmetry, table,
+            stop=None, budget=None):
     """
+    Search from puzzle for a solution, expanding the oldest frontier node
+    first if breadth_first is True and the newest one otherwise, and return
+    the path to it as built by get_parent, or None.
+
+    If stop is given, it is called every _STOP_INTERVAL expansions, and the
+    search gives up and returns None as soon as it returns True.  If budget
+    runs out first, an IncompleteSearch is returned.
+
+    @type puzzle: Puzzle
+    @type breadth_first: bool
+    @type check_on_push: bool
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type table: TranspositionTable | None
+    @type stop: () -> bool | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | IncompleteSearch | None
+    """
+    if not is_solvable(puzzle):
+        return None
+    if symmetry or (table is not None and table.symmetry):
+        symmetry, key_of = True, canonical_key
+    else:
+        key_of = state_key
     extensions = deque()
-    extensions.append(PuzzleNode(puzzle))
-    done = False
-    configuration = PuzzleNode()
+    extensions.append(_SearchNode(puzzle, -1, 0))
     visited = set()
-    while len(extensions) != 0 and not done:
-        configuration = extensions.popleft()
-        if str(configuration.puzzle) not in visited:
-            if configuration.puzzle.is_solved():
-                done = True
+    if check_on_push:
+        visited.add(key_of(puzzle))
+    return _expand(_SearchTree(puzzle), extensions, visited, breadth_first,
+                   check_on_push, stats, symmetry, table, stop, budget)
+
+
+def _expand(tree, extensions, visited, breadth_first, check_on_push, stats,
+            symmetry, table, stop, budget):
+    """
+    Carry on the search of _search from the _SearchNodes in the frontier
+    extensions, below the configurations already expanded into tree, with
+    the state keys in visited already visited.
+
+    @type tree: _SearchTree
+    @type extensions: deque[_SearchNode]
+    @type visited: set
+    @type breadth_first: bool
+    @type check_on_push: bool
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type table: TranspositionTable | None
+    @type stop: () -> bool | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | IncompleteSearch | None
+    """
+    if stats is None:
+        stats = SearchStats()
+    key_of = canonical_key if symmetry else state_key
+    if table is None:
+        # an empty table proves nothing dead and records nothing
+        dead = frozenset()
+    else:
+        dead = table.dead
+    hash_key = stats.timed(key_of, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    if budget is not None:
+        started, expanded = time.monotonic(), 0
+    solution, stopped, until_stop = None, False, _STOP_INTERVAL
+    while len(extensions) != 0 and solution is None:
+        if budget is not None:
+            reason = budget.exceeded(expanded, time.monotonic() - started,
+                                     len(extensions))
+            if reason is not None:
+                stats.peak_visited = max(stats.peak_visited, len(visited))
+                return IncompleteSearch(reason, _checkpoint(
+                    tree, extensions, visited, breadth_first, check_on_push,
+                    symmetry))
+        if stop is not None:
+            until_stop -= 1
+            if until_stop == 0:
+                if stop():
+                    stopped = True
+                    break
+                until_stop = _STOP_INTERVAL
+        if breadth_first:
+            configuration = extensions.popleft()
+        else:
+            configuration = extensions.pop()
+        if not check_on_push:
+            key = hash_key(configuration.puzzle)
+            if key in visited:
+                stats.duplicates += 1
+                continue
+            if key in dead:
+                stats.transpositions += 1
+                continue
+            visited.add(key)
+        if solved(configuration.puzzle):
+            solution = tree.path(configuration.parent, configuration.move)
+            break
+        if configuration.puzzle.fail_fast():
+            # nothing below configuration is a solution
+            stats.pruned += 1
+            continue
+        configs = extend(configuration.puzzle)
+        if budget is not None:
+            expanded += 1
+        parent = tree.add(configuration.parent, configuration.move)
+        if breadth_first:
+            moves = range(len(configs))
+        else:
+            # push in reverse so the first extension is explored first
+            moves = range(len(configs) - 1, -1, -1)
+        for move in moves:
+            config = configs[move]
+            if check_on_push:
+                key = hash_key(config)
+                if key in visited:
+                    stats.duplicates += 1
+                    continue
+                if key in dead:
+                    stats.transpositions += 1
+                    continue
+                visited.add(key)
+            extensions.append(_SearchNode(config, parent, move))
+        stats.count_expansion(len(configs), len(extensions), len(visited))
+    # the visited set only grows, and may have grown since the last
+    # expansion
+    stats.peak_visited = max(stats.peak_visited, len(visited))
+    if table is not None and not stopped:
+        _record_dead(table, visited, extensions, solution, key_of,
+                     check_on_push)
+    return solution
+
+
+def resume_search(checkpoint, stats=None, stop=None, budget=None):
+    """
+    Carry on the search saved in the checkpoint of an IncompleteSearch,
+    possibly in another process or on another machine, and return what
+    the original depth_first_solve or breadth_first_solve call would have:
+    a path from PuzzleNode of the original puzzle to a solution, None, or
+    another IncompleteSearch if budget runs out again.  stats, stop and
+    budget are as for depth_first_solve.
+
+    A checkpoint is unpickled, so only checkpoints from a trusted source
+    should be resumed.  It records the path to each configuration as the
+    positions of its moves among the extensions of its parents, so the
+    puzzle's extensions method must return configurations in the same
+    order in every interpreter, not in an order that depends on hash
+    randomisation.
+
+    @type checkpoint: bytes
+    @type stats: SearchStats | None
+    @type stop: () -> bool | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | IncompleteSearch | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cag"}
+    >>> result = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws),
+    ...                              budget=SearchBudget(max_nodes=2))
+    >>> result.reason
+    'nodes'
+    >>> path = resume_search(result.checkpoint)
+    >>> print(path.puzzle)
+    cat -> dog
+    >>> print(path.children[0].children[0].children[0].puzzle)
+    dog -> dog
+
+    Resuming in an interpreter with different hash randomisation finds a
+    path to a solution too.
+
+    >>> import subprocess, sys
+    >>> ws = {"cat", "bat", "hat", "cot", "cut", "hot", "bot", "hog", "cog",
+    ...       "dog", "dot", "tot", "tat"}
+    >>> result = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws),
+    ...                              budget=SearchBudget(max_nodes=4))
+    >>> code = ("import sys\\n"
+    ...         "from puzzle_tools import resume_search\\n"
+    ...         "path = resume_search(sys.stdin.buffer.read())\\n"
+    ...         "while path.children:\\n"
+    ...         "    path = path.children[0]\\n"
+    ...         "print(path.puzzle)\\n")
+    >>> ends = set()
+    >>> for seed in ["1", "2", "3", "4"]:
+    ...     ends.add(subprocess.run(
+    ...         [sys.executable, "-c", code], input=result.checkpoint,
+    ...         stdout=subprocess.PIPE, check=True,
+    ...         cwd=os.path.dirname(os.path.abspath(__file__)),
+    ...         env=dict(os.environ, PYTHONHASHSEED=seed)).stdout.strip())
+    >>> ends
+    {b'dog -> dog'}
+    """
+    saved = pickle.loads(checkpoint)
+    extensions = deque([_SearchNode(puzzle, parent, move)
+                        for puzzle, parent, move in saved["frontier"]])
+    return _expand(saved["tree"], extensions, saved["visited"],
+                   saved["breadth_first"], saved["check_on_push"], stats,
+                   saved["symmetry"], None, stop, budget)
+
+
+def _checkpoint(tree, extensions, visited, breadth_first, check_on_push,
+                symmetry):
+    """
+    Return the state of a search by _expand as a checkpoint for
+    resume_search: tree, the frontier extensions as (puzzle, parent, move)
+    triples, visited and the search settings.
+
+    @type tree: _SearchTree
+    @type extensions: deque[_SearchNode]
+    @type visited: set
+    @type breadth_first: bool
+    @type check_on_push: bool
+    @type symmetry: bool
+    @rtype: bytes
+    """
+    frontier = [(node.puzzle, node.parent, node.move) for node in extensions]
+    return pickle.dumps({"tree": tree, "frontier": frontier,
+                         "visited": visited, "breadth_first": breadth_first,
+                         "check_on_push": check_on_push,
+                         "symmetry": symmetry}, pickle.HIGHEST_PROTOCOL)
+
+
+def _record_dead(table, visited, extensions, solution, key_of,
+                 check_on_push):
+    """
+    Add to table the state keys in visited that a depth-first search,
+    having found the path from PuzzleNode solution (None if it failed) with
+    extensions left in its frontier, has proven to lead to no solution.
+
+    Without a solution, every configuration visited is dead.  Otherwise,
+    when checking on pop, every configuration visited whose subtree was
+    left unfinished is on the path to solution, so everything else visited
+    and not left in the frontier is dead.  When checking on push, a
+    configuration may be skipped in favour of a symmetric one still waiting
+    in the frontier, so nothing can be concluded.
+
+    @type table: TranspositionTable
+    @type visited: set
+    @type extensions: deque[_SearchNode]
+    @type solution: PuzzleNode | None
+    @type key_of: (Puzzle) -> object
+    @type check_on_push: bool
+    @rtype: None
+    """
+    if solution is None:
+        table.dead.update(visited)
+    elif not check_on_push:
+        alive = set([key_of(node.puzzle) for node in extensions])
+        alive.add(key_of(solution.puzzle))
+        while solution.children:
+            solution = solution.children[0]
+            alive.add(key_of(solution.puzzle))
+        table.dead.update(visited - alive)
+
+
+def lazy_depth_first_solve(puzzle, stats=None, symmetry=False, table=None,
+                           stop=None):
+    """
+    Return the path depth_first_solve(puzzle) would, searching with a
+    stack of iterators over extensions, as made by iter_extensions,
+    instead of a frontier of every extension made so far.  Only the
+    configurations on the current path and their unexplored siblings'
+    iterators are kept, and an extension is made only when the search gets
+    to it.  symmetry, table and stop are as for depth_first_solve; stats,
+    if given, counts the iterators on the stack as the frontier.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type table: TranspositionTable | None
+    @type stop: () -> bool | None
+    @rtype: PuzzleNode | None
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*", "*"], ["*", ".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> lazy_depth_first_solve(gpsp) == depth_first_solve(gpsp)
+    True
+    """
+    if not is_solvable(puzzle):
+        return None
+    if stats is None:
+        stats = SearchStats()
+    if symmetry or (table is not None and table.symmetry):
+        key_of = canonical_key
+    else:
+        key_of = state_key
+    if table is None:
+        dead = frozenset()
+    else:
+        dead = table.dead
+    hash_key = stats.timed(key_of, "hashing")
+    extend = stats.timed(iter_extensions, "extensions")
+    pull = stats.timed(_next_extension, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    # stack[i + 1] iterates over the extensions of path[i], whose state key
+    # is keys[i]
+    path, keys, stack, visited = [], [], [iter([puzzle])], set()
+    solution, stopped, until_stop = None, False, _STOP_INTERVAL
+    while len(stack) != 0:
+        config = pull(stack[-1])
+        if config is None:
+            stack.pop()
+            if len(path) != 0:
+                path.pop()
+                keys.pop()
+            continue
+        if len(path) != 0:
+            stats.generated += 1
+        if stop is not None:
+            until_stop -= 1
+            if until_stop == 0:
+                if stop():
+                    stopped = True
+                    break
+                until_stop = _STOP_INTERVAL
+        key = hash_key(config)
+        if key in visited:
+            stats.duplicates += 1
+            continue
+        if key in dead:
+            stats.transpositions += 1
+            continue
+        visited.add(key)
+        if solved(config):
+            solution = _chain(path + [config])
+            keys.append(key)
+            break
+        if config.fail_fast():
+            # nothing below config is a solution
+            stats.pruned += 1
+            continue
+        path.append(config)
+        keys.append(key)
+        stack.append(extend(config))
+        stats.count_expansion(0, len(stack), len(visited))
+    stats.peak_visited = max(stats.peak_visited, len(visited))
+    if table is not None and not stopped:
+        # every configuration visited off the path was fully explored
+        table.dead.update(visited - set(keys))
+    return solution
+
+
+def _next_extension(extensions):
+    """
+    Return the next configuration from the iterator extensions, or None if
+    there are none left.
+
+    @type extensions: iterator[Puzzle]
+    @rtype: Puzzle | None
+    """
+    return next(extensions, None)
+
+
+def inplace_depth_first_solve(puzzle, stats=None, symmetry=False,
+                              table=None, stop=None):
+    """
+    Return the path depth_first_solve(puzzle) would, searching by making
+    and taking back moves on puzzle itself instead of creating a new
+    configuration for every extension.  Puzzles without the legal_moves,
+    apply and undo methods are searched by lazy_depth_first_solve.
+
+    puzzle itself, not a copy, is changed during the search, and is put
+    back as it was before this returns or raises; its hash changes with
+    it meanwhile, so stop must not look it up in a set or dict.  The
+    configurations on the returned path are only created once a solution
+    is found.  symmetry, table, stop and stats are as for
+    lazy_depth_first_solve.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type symmetry: bool
+    @type table: TranspositionTable | None
+    @type stop: () -> bool | None
+    @rtype: PuzzleNode | None
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*", "*"], ["*", ".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> inplace_depth_first_solve(gpsp) == depth_first_solve(gpsp)
+    True
+    >>> grid
+    [['*', '*', '*', '*'], ['*', '.', '*', '*']]
+    """
+    if getattr(puzzle, "legal_moves", None) is None:
+        return lazy_depth_first_solve(puzzle, stats, symmetry, table, stop)
+    if not is_solvable(puzzle):
+        return None
+    if stats is None:
+        stats = SearchStats()
+    if symmetry or (table is not None and table.symmetry):
+        key_of = canonical_key
+    else:
+        key_of = state_key
+    if table is None:
+        dead = frozenset()
+    else:
+        dead = table.dead
+    hash_key = stats.timed(key_of, "hashing")
+    legal = stats.timed(_LEGAL_MOVES, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    key = hash_key(puzzle)
+    if key in dead:
+        stats.transpositions += 1
+        return None
+    # stack[i] iterates over the moves from puzzle after moves[:i] were
+    # made; keys[i] is the state key after them
+    moves, keys, visited, stack = [], [key], {key}, []
+    found, stopped, until_stop = solved(puzzle), False, _STOP_INTERVAL
+    if not found:
+        if puzzle.fail_fast():
+            stats.pruned += 1
+        else:
+            stack.append(iter(legal(puzzle)))
+            stats.count_expansion(0, len(stack), len(visited))
+    try:
+        while not found and len(stack) != 0:
+            move = next(stack[-1], _NO_MOVE)
+            if move is _NO_MOVE:
+                stack.pop()
+                if len(moves) != 0:
+                    puzzle.undo(moves.pop())
+                    keys.pop()
+                continue
+            stats.generated += 1
+            if stop is not None:
+                until_stop -= 1
+                if until_stop == 0:
+                    if stop():
+                        stopped = True
+                        break
+                    until_stop = _STOP_INTERVAL
+            puzzle.apply(move)
+            key = hash_key(puzzle)
+            if key in visited:
+                stats.duplicates += 1
+                puzzle.undo(move)
+                continue
+            if key in dead:
+                stats.transpositions += 1
+                puzzle.undo(move)
+                continue
+            visited.add(key)
+            moves.append(move)
+            keys.append(key)
+            if solved(puzzle):
+                found = True
+            elif puzzle.fail_fast():
+                # nothing below this configuration is a solution
+                stats.pruned += 1
+                puzzle.undo(moves.pop())
+                keys.pop()
             else:
-                for configs in configuration.puzzle.extensions():
-                    extensions.append(PuzzleNode(configs, parent=configuration))
-            visited.add(str(configuration.puzzle))
-    if done:
-        return get_parent(configuration)
+                stack.append(iter(legal(puzzle)))
+                stats.count_expansion(0, len(stack), len(visited))
+    finally:
+        # take back every move still made, noting the configurations on
+        # the path to a solution so that it can be rebuilt
+        path_keys = []
+        while len(moves) != 0:
+            path_keys.append(state_key(puzzle))
+            puzzle.undo(moves.pop())
+    stats.peak_visited = max(stats.peak_visited, len(visited))
+    if table is not None and not stopped:
+        if found:
+            table.dead.update(visited - set(keys))
+        else:
+            table.dead.update(visited)
+    if not found:
+        return None
+    return get_parent(_replay(PuzzleNode(puzzle), path_keys[::-1]))
+
+
+def iter_solutions(puzzle, strategy=None, limit=None, paths=True,
+                   stats=None):
+    """
+    Yield the solutions reachable from puzzle one at a time as they are
+    found, stopping after limit of them if limit is given.
+
+    strategy is depth_first_solve (the default) or breadth_first_solve.  If
+    paths is True, each solution is yielded as a path from
+    PuzzleNode(puzzle) like the one that strategy returns: depth-first,
+    every path to a solution that does not visit a configuration twice is
+    yielded; breadth-first, every shortest path to each solution is, in
+    order of length.  If paths is False, each solved configuration reached
+    is yielded once, without its path.  Solved configurations are not
+    extended further, and configurations whose fail_fast method returns
+    True are not extended.  If stats is given, the search is counted in it
+    as for depth_first_solve, as far as it has gone when each solution is
+    yielded.
+
+    @type puzzle: Puzzle
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type limit: int | None
+    @type paths: bool
+    @type stats: SearchStats | None
+    @rtype: iterator[PuzzleNode | Puzzle]
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> s = SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})
+    >>> len(list(iter_solutions(s, paths=False)))
+    288
+    >>> stats = SearchStats()
+    >>> len(list(iter_solutions(s, limit=2, paths=False, stats=stats)))
+    2
+    >>> stats.expanded > 0 and stats.generated > 0
+    True
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cag", "dag"}
+    >>> ladders = []
+    >>> for path in iter_solutions(WordLadderPuzzle("cat", "dog", ws),
+    ...                            breadth_first_solve):
+    ...     ladders.append([path.puzzle.state_key()])
+    ...     while path.children:
+    ...         path = path.children[0]
+    ...         ladders[-1].append(path.puzzle.state_key())
+    >>> for ladder in sorted(ladders):
+    ...     print(" ".join(ladder))
+    cat cag cog dog
+    cat cag dag dog
+    cat cot cog dog
+    """
+    if strategy is None:
+        strategy = depth_first_solve
+    assert strategy in (depth_first_solve, breadth_first_solve)
+    if limit is not None and limit <= 0:
+        return
+    if not is_solvable(puzzle):
+        return
+    if stats is None:
+        stats = SearchStats()
+    if strategy is breadth_first_solve:
+        solutions = _iter_breadth_first(puzzle, paths, stats)
+    elif paths:
+        solutions = _iter_paths_depth_first(puzzle, stats)
     else:
+        solutions = _iter_solved_depth_first(puzzle, stats)
+    found = 0
+    for solution in solutions:
+        yield solution
+        found += 1
+        if found == limit:
+            return
+
+
+def _iter_solved_depth_first(puzzle, stats):
+    """
+    Yield each solved configuration reachable from puzzle once, searching
+    depth-first and counting in stats.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats
+    @rtype: iterator[Puzzle]
+    """
+    key_of = stats.timed(state_key, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    visited, extensions = {key_of(puzzle)}, [puzzle]
+    while len(extensions) != 0:
+        config = extensions.pop()
+        if solved(config):
+            yield config
+        elif config.fail_fast():
+            stats.pruned += 1
+        else:
+            configs = extend(config)
+            # push in reverse so the first extension is explored first
+            for extension in configs[::-1]:
+                key = key_of(extension)
+                if key in visited:
+                    stats.duplicates += 1
+                else:
+                    visited.add(key)
+                    extensions.append(extension)
+            stats.count_expansion(len(configs), len(extensions), len(visited))
+
+
+def _iter_paths_depth_first(puzzle, stats):
+    """
+    Yield, as paths built by _chain, every path from puzzle to a solution
+    that does not visit a configuration twice, searching depth-first and
+    counting in stats.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats
+    @rtype: iterator[PuzzleNode]
+    """
+    key_of = stats.timed(state_key, "hashing")
+    extend = stats.timed(iter_extensions, "extensions")
+    pull = stats.timed(_next_extension, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    if solved(puzzle):
+        yield _chain([puzzle])
+        return
+    if puzzle.fail_fast():
+        stats.pruned += 1
+        return
+    path, keys = [puzzle], [key_of(puzzle)]
+    on_path = set(keys)
+    stack = [extend(puzzle)]
+    stats.count_expansion(0, len(stack), len(on_path))
+    while len(stack) != 0:
+        config = pull(stack[-1])
+        if config is None:
+            stack.pop()
+            path.pop()
+            on_path.discard(keys.pop())
+            continue
+        stats.generated += 1
+        key = key_of(config)
+        if key in on_path:
+            stats.duplicates += 1
+            continue
+        if solved(config):
+            yield _chain(path + [config])
+        elif config.fail_fast():
+            stats.pruned += 1
+        else:
+            path.append(config)
+            keys.append(key)
+            on_path.add(key)
+            stack.append(extend(config))
+            stats.count_expansion(0, len(stack), len(on_path))
+
+
+def _iter_breadth_first(puzzle, paths, stats):
+    """
+    Search breadth-first from puzzle one layer at a time, counting in
+    stats, and yield each solved configuration once as it is reached, or
+    if paths is True every shortest path to it, as built by _chain.
+
+    @type puzzle: Puzzle
+    @type paths: bool
+    @type stats: SearchStats
+    @rtype: iterator[PuzzleNode | Puzzle]
+    """
+    key_of = stats.timed(state_key, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    # the configuration and, if paths, the keys of its parents in the
+    # previous layer, for every state key reached
+    key = key_of(puzzle)
+    reached, layer = {key: (puzzle, [])}, [key]
+    while len(layer) != 0:
+        next_layer, in_next_layer = [], set()
+        for key in layer:
+            config = reached[key][0]
+            if solved(config):
+                if paths:
+                    for path in _shortest_paths(key, reached):
+                        yield path
+                else:
+                    yield config
+            elif config.fail_fast():
+                stats.pruned += 1
+            else:
+                configs = extend(config)
+                for extension in configs:
+                    extension_key = key_of(extension)
+                    if extension_key not in reached:
+                        reached[extension_key] = (extension, [])
+                        next_layer.append(extension_key)
+                        in_next_layer.add(extension_key)
+                    else:
+                        stats.duplicates += 1
+                    if paths and extension_key in in_next_layer:
+                        # another shortest way to extension
+                        reached[extension_key][1].append(key)
+                stats.count_expansion(len(configs), len(next_layer),
+                                      len(reached))
+        layer = next_layer
+
+
+def _shortest_paths(key, reached):
+    """
+    Yield, as paths built by _chain, every path to the configuration with
+    state key key through the parents recorded in reached by
+    _iter_breadth_first.
+
+    @type key: object
+    @type reached: dict[object, (Puzzle, list[object])]
+    @rtype: iterator[PuzzleNode]
+    """
+    stack = [[key]]
+    while len(stack) != 0:
+        keys = stack.pop()
+        parents = reached[keys[-1]][1]
+        if len(parents) == 0:
+            yield _chain([reached[k][0] for k in keys[::-1]])
+        for parent in parents[::-1]:
+            stack.append(keys + [parent])
+
+
+def _chain(puzzles):
+    """
+    Return the path from a PuzzleNode of the first of puzzles down to one
+    of the last, as built by get_parent, each an extension of the one
+    before.
+
+    @type puzzles: list[Puzzle]
+    @rtype: PuzzleNode
+    """
+    configuration = None
+    for config in puzzles:
+        configuration = PuzzleNode(config, parent=configuration)
+    return get_parent(configuration)
+
+
+def parallel_solve(puzzle, breadth_first=False, workers=None, width=None,
+                   check_on_push=False, symmetry=False, stats=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, with each child PuzzleNode containing an extension of the
+    puzzle in its parent, searching on several processes at once.  Return
+    None if this is not possible.
+
+    puzzle is extended breadth-first until a whole layer of at least width
+    configurations (4 per worker by default) is reached.  The subtrees
+    below that layer are then searched by depth_first_solve, or
+    breadth_first_solve if breadth_first is True, on a pool of workers
+    processes (one per CPU by default), and the first solution found stops
+    the other searches.  Each subtree is searched separately, so with
+    breadth_first the path is shortest within its subtree but may not be
+    the shortest overall.  Objects shared by the configurations of that
+    layer, such as the word set of a WordLadderPuzzle, are sent to each
+    worker once rather than with every subtree.  puzzle and its extensions
+    must be picklable.  If stats is given, the counts of the searches that
+    finished are added to it; its progress function is only called for
+    the first layers.
+
+    @type puzzle: Puzzle
+    @type breadth_first: bool
+    @type workers: int | None
+    @type width: int | None
+    @type check_on_push: bool
+    @type symmetry: bool
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> path = parallel_solve(MNPuzzle(start_grid, target_grid),
+    ...                       breadth_first=True, workers=2)
+    >>> while path.children:
+    ...     path = path.children[0]
+    >>> path.puzzle.is_solved()
+    True
+    """
+    if not is_solvable(puzzle):
         return None
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if width is None:
+        width = 4 * workers
+    if stats is None:
+        stats = SearchStats()
+    key_of = stats.timed(canonical_key if symmetry else state_key, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    layer, reached = [PuzzleNode(puzzle)], {key_of(puzzle)}
+    while 0 < len(layer) < width:
+        next_layer = []
+        for configuration in layer:
+            if solved(configuration.puzzle):
+                return get_parent(configuration)
+            if configuration.puzzle.fail_fast():
+                stats.pruned += 1
+                continue
+            configs = extend(configuration.puzzle)
+            for config in configs:
+                key = key_of(config)
+                if key in reached:
+                    stats.duplicates += 1
+                else:
+                    reached.add(key)
+                    next_layer.append(PuzzleNode(config,
+                                                 parent=configuration))
+            stats.count_expansion(len(configs), len(next_layer),
+                                  len(reached))
+        layer = next_layer
+    shared = _shared_objects([node.puzzle for node in layer])
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(workers, initializer=_start_worker,
+                             initargs=(shared, stop)) as executor:
+        futures = {executor.submit(_solve_subtree,
+                                   _dump_shared(node.puzzle, shared),
+                                   breadth_first, check_on_push,
+                                   symmetry, stats.timing): node
+                   for node in layer}
+        for future in as_completed(futures):
+            keys, subtree_stats = future.result()
+            stats.add(subtree_stats)
+            if keys is not None:
+                stop.set()
+                for other in futures:
+                    other.cancel()
+                return get_parent(_replay(futures[future], keys))
+    return None
+
+
+def solve_many(puzzles, strategy=None, workers=None,
+               timeout_per_puzzle=None, chunksize=None):
+    """
+    Solve each of puzzles with strategy (depth_first_solve by default) on a
+    pool of workers processes (one per CPU by default), and yield a
+    SolveResult for each as soon as it is done, in order of completion.
+
+    The puzzles are handed out chunksize at a time, so idle workers keep
+    taking the next chunk until none are left.  If timeout_per_puzzle is
+    given, strategy must take a stop keyword argument like
+    depth_first_solve, and a search that runs longer than that many
+    seconds is given up.  Objects shared by two or more puzzles, such as
+    the word set of WordLadderPuzzles, are sent to each worker once rather
+    than with every chunk.  strategy and the puzzles must be picklable.
+    If the caller stops early, solve_many returns without waiting for the
+    workers, which skip the rest of their chunks, and also give up the
+    puzzles they are solving if timeout_per_puzzle is given.
+
+    @type puzzles: list[Puzzle]
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type workers: int | None
+    @type timeout_per_puzzle: float | None
+    @type chunksize: int | None
+    @rtype: iterator[SolveResult]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cap"}
+    >>> puzzles = [WordLadderPuzzle(w, "dog", ws) for w in ("cot", "cap")]
+    >>> results = solve_many(puzzles, breadth_first_solve, workers=2)
+    >>> for result in sorted(results, key=lambda result: result.index):
+    ...     print(result.index, result.status, result.path.puzzle)
+    0 solved cot -> dog
+    1 solved cap -> dog
+    """
+    puzzles = list(puzzles)
+    if strategy is None:
+        strategy = depth_first_solve
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, min(32, len(puzzles) // (4 * workers)))
+    shared = _shared_objects(puzzles)
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(workers, initializer=_start_worker,
+                                   initargs=(shared, stop))
+    futures = []
+    try:
+        for start in range(0, len(puzzles), chunksize):
+            chunk = _dump_shared(
+                [(i, puzzles[i]) for i in
+                 range(start, min(start + chunksize, len(puzzles)))], shared)
+            futures.append(executor.submit(_solve_chunk, chunk, strategy,
+                                           timeout_per_puzzle))
+        for future in as_completed(futures):
+            for i, status, keys, seconds in future.result():
+                path = None
+                if keys is not None:
+                    path = get_parent(_replay(PuzzleNode(puzzles[i]), keys))
+                yield SolveResult(i, puzzles[i], status, path, seconds)
+    finally:
+        # if the caller stops early, drop the chunks not yet started and
+        # tell the workers to give up on those they are solving
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _replay(node, keys):
+    """
+    Extend PuzzleNode node with a child for each configuration whose state
+    key is next in keys, each an extension of the last, and return the
+    last PuzzleNode added.
+
+    @type node: PuzzleNode
+    @type keys: list[object]
+    @rtype: PuzzleNode
+    """
+    for key in keys:
+        node = PuzzleNode([config for config in node.puzzle.extensions()
+                           if state_key(config) == key][0], parent=node)
+    return node
+
+
+# calls to the extensions and is_solved methods of a puzzle
+_EXTENSIONS = methodcaller("extensions")
+_IS_SOLVED = methodcaller("is_solved")
+_LEGAL_MOVES = methodcaller("legal_moves")
+# what inplace_depth_first_solve gets from a stack of moves with none left
+_NO_MOVE = object()
+# how many expansions _search makes between calls to its stop function
+_STOP_INTERVAL = 256
+# set in a parallel_solve worker process once any worker finds a solution,
+# or in a solve_many worker process once its caller stops early
+_stop_event = None
+
+
+def _path_keys(path):
+    """
+    Return the state keys of the configurations below the first one on
+    the path built by get_parent from PuzzleNode path.
+
+    @type path: PuzzleNode
+    @rtype: list[object]
+    """
+    keys = []
+    while path.children:
+        path = path.children[0]
+        keys.append(state_key(path.puzzle))
+    return keys
+
+
+def _solve_subtree(data, breadth_first, check_on_push, symmetry, timing):
+    """
+    Search from the puzzle pickled in data by _dump_shared in a
+    parallel_solve worker process, and return the state keys of the
+    configurations on the path from below that puzzle down to a solution,
+    or None if there is none or another worker found one first, together
+    with the SearchStats of the search, timed if timing is True.
+
+    @type data: bytes
+    @type breadth_first: bool
+    @type check_on_push: bool
+    @type symmetry: bool
+    @type timing: bool
+    @rtype: (list[object] | None, SearchStats)
+    """
+    stats = SearchStats(timing)
+    solution = _search(_load_shared(data), breadth_first, check_on_push,
+                       stats, symmetry, None, _stop_event.is_set)
+    if solution is None:
+        return None, stats
+    return _path_keys(solution), stats
+
+
+# objects sent once to a parallel_solve or solve_many worker process, which
+# the puzzles it is given refer to by index
+_shared = []
+
+
+def _shared_objects(puzzles):
+    """
+    Return the attribute values, other than numbers and strings, that are
+    the same object in two or more of puzzles.
+
+    @type puzzles: list[Puzzle]
+    @rtype: list[object]
+    """
+    seen, shared = {}, {}
+    for puzzle in puzzles:
+        for value in getattr(puzzle, "__dict__", {}).values():
+            if (value is not None and
+                    not isinstance(value, (bool, int, float, str, bytes))):
+                if id(value) in seen and seen[id(value)] is not puzzle:
+                    shared[id(value)] = value
+                seen[id(value)] = puzzle
+    return list(shared.values())
+
+
+def _dump_shared(obj, shared):
+    """
+    Return obj pickled with each object in shared replaced by its index.
+
+    @type obj: object
+    @type shared: list[object]
+    @rtype: bytes
+    """
+    indexes = {id(shared[i]): i for i in range(len(shared))}
+    data = io.BytesIO()
+    pickler = pickle.Pickler(data, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda value: indexes.get(id(value))
+    pickler.dump(obj)
+    return data.getvalue()
+
+
+def _load_shared(data):
+    """
+    Return the object pickled in data by _dump_shared, in a worker process
+    given the same shared objects by _start_worker.
+
+    @type data: bytes
+    @rtype: object
+    """
+    unpickler = pickle.Unpickler(io.BytesIO(data))
+    unpickler.persistent_load = lambda i: _shared[i]
+    return unpickler.load()
+
+
+def _start_worker(shared, stop):
+    """
+    Record the objects shared by the puzzles of a parallel_solve or
+    solve_many call, and the multiprocessing.Event stop that tells it to
+    give up, in this worker process.
+
+    @type shared: list[object]
+    @type stop: multiprocessing.Event
+    @rtype: None
+    """
+    global _shared, _stop_event
+    _shared, _stop_event = shared, stop
+
+
+def _solve_chunk(chunk, strategy, timeout):
+    """
+    Solve the (index, puzzle) pairs pickled in chunk by _dump_shared with
+    strategy in a solve_many worker process, giving up on each after
+    timeout seconds if it is not None.  Return (index, status, state keys
+    of the path below the puzzle or None, seconds taken) for each puzzle
+    tried before the caller of solve_many stopped; with a timeout, the
+    search in progress then is given up too.
+
+    @type chunk: bytes
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type timeout: float | None
+    @rtype: list[(int, str, list[object] | None, float)]
+    """
+    results = []
+    for i, puzzle in _load_shared(chunk):
+        if _stop_event.is_set():
+            break
+        start = time.monotonic()
+        if timeout is None:
+            path, timed_out = strategy(puzzle), False
+        else:
+            deadline = start + timeout
+            path = strategy(puzzle,
+                            stop=lambda: (_stop_event.is_set() or
+                                          time.monotonic() > deadline))
+            timed_out = time.monotonic() > deadline
+        if path is not None:
+            status, keys = "solved", _path_keys(path)
+        else:
+            status, keys = "timeout" if timed_out else "unsolvable", None
+        results.append((i, status, keys, time.monotonic() - start))
+    return results
+
+
+def astar_solve(puzzle, heuristic=None, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, found by A* search, with each child PuzzleNode
+    containing an extension of the puzzle in its parent.  Return None if
+    this is not possible.
+
+    heuristic maps a Puzzle to an estimate of the number of extensions
+    still needed; the path is shortest if it never overestimates.  If
+    heuristic is None, the puzzle's own heuristic method is used, or 0
+    if it has none.  Counts are recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> path = astar_solve(MNPuzzle(start_grid, target_grid))
+    >>> length = 0
+    >>> while path.children:
+    ...     path, length = path.children[0], length + 1
+    >>> length
+    3
+    """
+    if not is_solvable(puzzle):
+        return None
+    heuristic = _get_heuristic(puzzle, heuristic)
+    if stats is None:
+        stats = SearchStats()
+    key_of = stats.timed(state_key, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    # tie-breaking counter keeps the heap from ever comparing _SearchNodes
+    tie = count()
+    frontier = [(heuristic(puzzle), 0, next(tie), _SearchNode(puzzle, -1, 0))]
+    tree, best_cost = _SearchTree(puzzle), {key_of(puzzle): 0}
+    while len(frontier) != 0:
+        _, cost, _, configuration = heappop(frontier)
+        cost = -cost
+        if best_cost[key_of(configuration.puzzle)] < cost:
+            # a cheaper route to this configuration was found after it
+            # was pushed
+            stats.duplicates += 1
+            continue
+        if solved(configuration.puzzle):
+            return tree.path(configuration.parent, configuration.move)
+        configs = extend(configuration.puzzle)
+        parent = tree.add(configuration.parent, configuration.move)
+        for move in range(len(configs)):
+            config = configs[move]
+            key = key_of(config)
+            if key not in best_cost or cost + 1 < best_cost[key]:
+                best_cost[key] = cost + 1
+                # prefer deeper configurations among those with equal f
+                heappush(frontier, (cost + 1 + heuristic(config), -cost - 1,
+                                    next(tie),
+                                    _SearchNode(config, parent, move)))
+            else:
+                stats.duplicates += 1
+        stats.count_expansion(len(configs), len(frontier), len(best_cost))
+    return None
+
+
+def ida_star_solve(puzzle, heuristic=None, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, found by iterative-deepening A*, with each child
+    PuzzleNode containing an extension of the puzzle in its parent.
+    Return None if this is not possible.
+
+    Unlike astar_solve, only the configurations on the current path are
+    kept in memory, so this may be used where A* runs out of memory.
+    heuristic and stats are as for astar_solve; the configurations
+    extended by every iteration are counted.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cag"}
+    >>> path = ida_star_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> print(path.children[0].children[0].children[0].puzzle)
+    dog -> dog
+    """
+    if not is_solvable(puzzle):
+        return None
+    heuristic = _get_heuristic(puzzle, heuristic)
+    if stats is None:
+        stats = SearchStats()
+    bound = heuristic(puzzle)
+    while bound is not None:
+        path, bound = _ida_star_probe(puzzle, heuristic, bound, stats)
+        if path is not None:
+            return _chain(path)
+    return None
+
+
+def _ida_star_probe(puzzle, heuristic, bound, stats):
+    """
+    Depth-first search from puzzle for a solution without following any
+    extension whose cost so far plus heuristic exceeds bound, counting in
+    stats.  Return the list of configurations from puzzle to the solution,
+    or None, together with the smallest cost estimate that exceeded bound
+    (None if none did).
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int
+    @type bound: int
+    @type stats: SearchStats
+    @rtype: (list[Puzzle] | None, int | None)
+    """
+    key_of = stats.timed(state_key, "hashing")
+    extend = stats.timed(_EXTENSIONS, "extensions")
+    solved = stats.timed(_IS_SOLVED, "is_solved")
+    if solved(puzzle):
+        return [puzzle], None
+    path, keys = [puzzle], [key_of(puzzle)]
+    on_path = set(keys)
+    configs = extend(puzzle)
+    stack = [iter(configs)]
+    stats.count_expansion(len(configs), len(stack), len(on_path))
+    exceeded = None
+    while len(stack) != 0:
+        config = next(stack[-1], None)
+        if config is None:
+            stack.pop()
+            path.pop()
+            on_path.discard(keys.pop())
+            continue
+        key = key_of(config)
+        if key in on_path:
+            stats.duplicates += 1
+            continue
+        estimate = len(path) + heuristic(config)
+        if estimate > bound:
+            if exceeded is None or estimate < exceeded:
+                exceeded = estimate
+        elif solved(config):
+            return path + [config], None
+        else:
+            path.append(config)
+            keys.append(key)
+            on_path.add(key)
+            configs = extend(config)
+            stack.append(iter(configs))
+            stats.count_expansion(len(configs), len(stack), len(on_path))
+    return None, exceeded
+
+
+def bidirectional_solve(puzzle, stats=None):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, with each child PuzzleNode containing an
+    extension of the puzzle in its parent.  Return None if this is not
+    possible.
+
+    The search runs breadth-first from puzzle and backwards from its solved
+    configuration at the same time, and joins the two halves where they
+    meet.  This needs puzzle to provide goal_state, returning the solved
+    configuration, and reverse_extensions, returning the configurations
+    that extend to a given one.  Puzzles without these are solved with
+    breadth_first_solve.  Counts are recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: PuzzleNode | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cap"}
+    >>> path = bidirectional_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> while path.children:
+    ...     print(path.puzzle)
+    ...     path = path.children[0]
+    cat -> dog
+    cot -> dog
+    cog -> dog
+    >>> print(path.puzzle)
+    dog -> dog
+    """
+    if (getattr(puzzle, "goal_state", None) is None or
+            getattr(puzzle, "reverse_extensions", None) is None):
+        return breadth_first_solve(puzzle, check_on_push=True, stats=stats)
+    if not is_solvable(puzzle):
+        return None
+    if stats is None:
+        stats = SearchStats()
+    if stats.timed(_IS_SOLVED, "is_solved")(puzzle):
+        return PuzzleNode(puzzle)
+    # each side maps the state key of every configuration it has reached to
+    # its PuzzleNode; backward PuzzleNodes have their parent towards the goal
+    forward_start = PuzzleNode(puzzle)
+    backward_start = PuzzleNode(puzzle.goal_state())
+    forward = {state_key(puzzle): forward_start}
+    backward = {state_key(backward_start.puzzle): backward_start}
+    forward_layer, backward_layer = [forward_start], [backward_start]
+    while len(forward_layer) != 0 and len(backward_layer) != 0:
+        # grow the smaller side by one whole layer
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = _grow_layer(forward_layer, forward,
+                                                 backward, False, stats)
+        else:
+            backward_layer, meeting = _grow_layer(backward_layer, backward,
+                                                  forward, True, stats)
+        if meeting is not None:
+            configuration, tail = forward[meeting], backward[meeting].parent
+            while tail is not None:
+                configuration = PuzzleNode(tail.puzzle, parent=configuration)
+                tail = tail.parent
+            return get_parent(configuration)
+    return None
+
+
+def _grow_layer(layer, reached, other, reverse, stats):
+    """
+    Extend every PuzzleNode in layer, recording new configurations in
+    reached and counting in stats, and return the next layer together with
+    the state key of a configuration also reached by the other side of the
+    search, or None.  Among such configurations, the one closest to the
+    other side's start is chosen, so that the joined path is as short as
+    possible.
+
+    @type layer: list[PuzzleNode]
+    @type reached: dict[object, PuzzleNode]
+    @type other: dict[object, PuzzleNode]
+    @type reverse: bool
+    @type stats: SearchStats
+    @rtype: (list[PuzzleNode], object | None)
+    """
+    key_of = stats.timed(state_key, "hashing")
+    if reverse:
+        extend = stats.timed(methodcaller("reverse_extensions"),
+                             "extensions")
+    else:
+        extend = stats.timed(_EXTENSIONS, "extensions")
+    next_layer, meeting, meeting_depth = [], None, None
+    for configuration in layer:
+        configs = extend(configuration.puzzle)
+        for config in configs:
+            key = key_of(config)
+            if key in reached:
+                stats.duplicates += 1
+            else:
+                node = PuzzleNode(config, parent=configuration)
+                reached[key] = node
+                next_layer.append(node)
+                if key in other:
+                    depth = _depth(other[key])
+                    if meeting is None or depth < meeting_depth:
+                        meeting, meeting_depth = key, depth
+        stats.count_expansion(len(configs), len(next_layer),
+                              len(reached) + len(other))
+    return next_layer, meeting
+
+
+def _depth(node):
+    """
+    Return the number of parents above PuzzleNode node.
+
+    @type node: PuzzleNode
+    @rtype: int
+    """
+    depth = 0
+    while node.parent is not None:
+        node, depth = node.parent, depth + 1
+    return depth
+
+
+def _get_heuristic(puzzle, heuristic):
+    """
+    Return heuristic, or if it is None the heuristic method of puzzle, or a
+    heuristic that always estimates 0 if puzzle has no such method.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @rtype: (Puzzle) -> int
+    """
+    if heuristic is not None:
+        return heuristic
+    if getattr(puzzle, "heuristic", None) is not None:
+        return type(puzzle).heuristic
+    return lambda config: 0
+
+
+class SolveResult:
+    """
+    The outcome of solving one puzzle in solve_many.
+
+    index - position of puzzle among the puzzles given to solve_many
+    puzzle - the puzzle solved
+    status - "solved", "unsolvable", or "timeout" if the search was given up
+    path - the path to a solution as returned by the strategy, or None
+    seconds - time the worker spent on puzzle
+    """
+
+    def __init__(self, index, puzzle, status, path, seconds):
+        """
+        Create a new SolveResult self.
+
+        @type self: SolveResult
+        @type index: int
+        @type puzzle: Puzzle
+        @type status: str
+        @type path: PuzzleNode | None
+        @type seconds: float
+        @rtype: None
+        """
+        self.index, self.puzzle, self.status = index, puzzle, status
+        self.path, self.seconds = path, seconds
+
+
+class SearchBudget:
+    """
+    Limits on the work a single depth_first_solve or breadth_first_solve
+    call may do before returning an IncompleteSearch.  A limit of None is
+    no limit.
+
+    max_nodes - number of configurations to extend
+    max_seconds - wall time in seconds
+    max_frontier - number of PuzzleNodes waiting in the frontier
+    """
+
+    def __init__(self, max_nodes=None, max_seconds=None, max_frontier=None):
+        """
+        Create a new SearchBudget self.
+
+        @type self: SearchBudget
+        @type max_nodes: int | None
+        @type max_seconds: float | None
+        @type max_frontier: int | None
+        @rtype: None
+        """
+        self.max_nodes, self.max_seconds = max_nodes, max_seconds
+        self.max_frontier = max_frontier
+
+    def exceeded(self, nodes, seconds, frontier):
+        """
+        Return which limit of SearchBudget self a search that has extended
+        nodes configurations in seconds, with frontier PuzzleNodes waiting,
+        has reached: "nodes", "seconds" or "frontier", or None if none.
+
+        @type self: SearchBudget
+        @type nodes: int
+        @type seconds: float
+        @type frontier: int
+        @rtype: str | None
+
+        >>> SearchBudget(max_nodes=10).exceeded(10, 0.5, 3)
+        'nodes'
+        >>> SearchBudget(max_seconds=1.0).exceeded(10, 0.5, 3) is None
+        True
+        """
+        if self.max_nodes is not None and nodes >= self.max_nodes:
+            return "nodes"
+        if self.max_seconds is not None and seconds >= self.max_seconds:
+            return "seconds"
+        if self.max_frontier is not None and frontier >= self.max_frontier:
+            return "frontier"
+        return None
+
+
+class IncompleteSearch:
+    """
+    The result of a search that ran out of its SearchBudget.
+
+    reason - the limit reached: "nodes", "seconds" or "frontier"
+    checkpoint - the pickled frontier, visited set and settings of the
+                 search, to be carried on by resume_search
+    """
+
+    def __init__(self, reason, checkpoint):
+        """
+        Create a new IncompleteSearch self.
+
+        @type self: IncompleteSearch
+        @type reason: str
+        @type checkpoint: bytes
+        @rtype: None
+        """
+        self.reason, self.checkpoint = reason, checkpoint
+
+
+class SearchStats:
+    """
+    Counters collected by a solver during a single search.
+
+    expanded - number of configurations whose extensions were generated
+    generated - number of extensions generated
+    duplicates - number of configurations dropped because their state had
+                 already been visited (or queued, when checking on push)
+    transpositions - number of configurations dropped because a
+                     TranspositionTable recorded them as dead
+    pruned - number of configurations not extended because their fail_fast
+             showed they lead to no solution
+    peak_frontier - largest number of configurations waiting to be
+                    extended at once
+    peak_visited - largest number of state keys remembered at once
+    extensions_seconds - time spent in extensions, if timing
+    is_solved_seconds - time spent in is_solved, if timing
+    hashing_seconds - time spent working out state keys, if timing
+    """
+
+    def __init__(self, timing=False, progress=None, progress_every=10000):
+        """
+        Create a new SearchStats self with all counters at zero.  If timing
+        is True, solvers also time the calls they make to the puzzle.  If
+        progress is given, it is called with self after every
+        progress_every expansions.
+
+        @type self: SearchStats
+        @type timing: bool
+        @type progress: (SearchStats) -> object | None
+        @type progress_every: int
+        @rtype: None
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cat", "cot", "cog", "dog", "cag"}
+        >>> seen = []
+        >>> stats = SearchStats(progress=seen.append, progress_every=2)
+        >>> path = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws),
+        ...                            stats=stats)
+        >>> stats.expanded, stats.generated, stats.peak_visited
+        (4, 9, 5)
+        >>> seen == [stats, stats]
+        True
+        """
+        self.timing, self.progress = timing, progress
+        self.progress_every = progress_every
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.transpositions = 0
+        self.pruned = 0
+        self.peak_frontier = 0
+        self.peak_visited = 0
+        self.extensions_seconds = 0.0
+        self.is_solved_seconds = 0.0
+        self.hashing_seconds = 0.0
+
+    def count_expansion(self, generated, frontier, visited):
+        """
+        Record in SearchStats self that a configuration was extended to
+        generated configurations, leaving frontier configurations waiting
+        and visited state keys remembered.
+
+        @type self: SearchStats
+        @type generated: int
+        @type frontier: int
+        @type visited: int
+        @rtype: None
+        """
+        self.expanded += 1
+        self.generated += generated
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        if visited > self.peak_visited:
+            self.peak_visited = visited
+        if (self.progress is not None and
+                self.expanded % self.progress_every == 0):
+            self.progress(self)
+
+    def timed(self, function, name):
+        """
+        Return function, or if SearchStats self is timing, a function that
+        calls it and adds the time taken to the name + "_seconds" counter.
+
+        @type self: SearchStats
+        @type function: (Puzzle) -> object
+        @type name: str
+        @rtype: (Puzzle) -> object
+
+        >>> stats = SearchStats(timing=True)
+        >>> stats.timed(len, "hashing")("abc")
+        3
+        >>> stats.hashing_seconds > 0
+        True
+        """
+        if not self.timing:
+            return function
+        counter = name + "_seconds"
+
+        def timed_function(puzzle):
+            start = time.perf_counter()
+            result = function(puzzle)
+            setattr(self, counter, getattr(self, counter) +
+                    time.perf_counter() - start)
+            return result
+        return timed_function
+
+    def add(self, other):
+        """
+        Add the counters of SearchStats other, from a separate search, to
+        SearchStats self.  Peaks are the larger of the two.
+
+        @type self: SearchStats
+        @type other: SearchStats
+        @rtype: None
+        """
+        for name in ("expanded", "generated", "duplicates", "transpositions",
+                     "pruned", "extensions_seconds", "is_solved_seconds",
+                     "hashing_seconds"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.peak_frontier = max(self.peak_frontier, other.peak_frontier)
+        self.peak_visited = max(self.peak_visited, other.peak_visited)
+
+
+class TranspositionTable:
+    """
+    Configurations proven to lead to no solution, remembered across
+    depth-first searches of the same puzzle.
+
+    Only puzzles whose extensions can never lead back to an earlier
+    configuration, like peg solitaire, may share a table: in other puzzles
+    a configuration may be left unexplored only because it was already on
+    the current path.
+
+    symmetry - whether configurations are keyed by canonical_key rather
+               than state_key
+    dead - keys of configurations proven to lead to no solution
+    """
+
+    def __init__(self, symmetry=True):
+        """
+        Create a new empty TranspositionTable self.
+
+        @type self: TranspositionTable
+        @type symmetry: bool
+        @rtype: None
+
+        >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        >>> grid = [["*", "*", ".", "."], ["*", ".", ".", "."]]
+        >>> table = TranspositionTable()
+        >>> depth_first_solve(GridPegSolitairePuzzle(grid, {"*", "."}),
+        ...                   table=table) is None
+        True
+        >>> len(table)
+        2
+        """
+        self.symmetry, self.dead = symmetry, set()
+
+    def __len__(self):
+        """
+        Return the number of dead configurations in TranspositionTable self.
+
+        @type self: TranspositionTable
+        @rtype: int
+        """
+        return len(self.dead)
+
+
+class _SearchTree:
+    """
+    The configurations expanded by a search, held compactly: each is
+    numbered in order of expansion, and only its parent's number and its
+    move, the index of the configuration among its parent's extensions, are
+    kept.  Every configuration can be rebuilt by replaying the moves from
+    the first one, which is the only puzzle kept.
+
+    puzzle - the configuration the search started from
+    parents - the number of each configuration's parent, -1 for puzzle
+    moves - the move from each configuration's parent to it
+    """
+
+    def __init__(self, puzzle):
+        """
+        Create a new _SearchTree self for a search from puzzle, with nothing
+        expanded yet.
+
+        @type self: _SearchTree
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self.puzzle = puzzle
+        self.parents, self.moves = array("l"), array("L")
+
+    def add(self, parent, move):
+        """
+        Record in _SearchTree self the configuration reached by move from
+        the one numbered parent, and return its number.
+
+        @type self: _SearchTree
+        @type parent: int
+        @type move: int
+        @rtype: int
+        """
+        self.parents.append(parent)
+        self.moves.append(move)
+        return len(self.parents) - 1
+
+    def path(self, parent, move):
+        """
+        Return the path, as built by get_parent, from a PuzzleNode of the
+        first configuration in _SearchTree self to one of the configuration
+        reached by move from the one numbered parent, or of the first
+        configuration itself if parent is -1.
+
+        @type self: _SearchTree
+        @type parent: int
+        @type move: int
+        @rtype: PuzzleNode
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> tree = _SearchTree(WordLadderPuzzle("cat", "dog",
+        ...                                     {"cat", "cot", "dog"}))
+        >>> print(tree.path(tree.add(-1, 0), 0).children[0].puzzle)
+        cot -> dog
+        """
+        moves = []
+        while parent != -1:
+            moves.append(move)
+            parent, move = self.parents[parent], self.moves[parent]
+        configuration = PuzzleNode(self.puzzle)
+        for move in reversed(moves):
+            configuration = PuzzleNode(configuration.puzzle.extensions()[move],
+                                       parent=configuration)
+        return get_parent(configuration)
+
+
+class _SearchNode:
+    """
+    A configuration waiting in the frontier of a search, and how it was
+    reached: by move from the configuration numbered parent in the
+    search's _SearchTree.
+    """
+    __slots__ = ("puzzle", "parent", "move")
+
+    def __init__(self, puzzle, parent, move):
+        """
+        Create a new _SearchNode self.
+
+        @type self: _SearchNode
+        @type puzzle: Puzzle
+        @type parent: int
+        @type move: int
+        @rtype: None
+        """
+        self.puzzle, self.parent, self.move = puzzle, parent, move
 
 
 # Class PuzzleNode helps build trees of PuzzleNodes that have
@@ -100,6 +1931,7 @@ class PuzzleNode:
     A Puzzle configuration that refers to other configurations that it
     can be extended to.
     """
+    __slots__ = ("puzzle", "children", "parent")
 
     def __init__(self, puzzle=None, children=None, parent=None):
         """
@@ -134,10 +1966,18 @@ class PuzzleNode:
         >>> pn1.__eq__(pn3)
         False
         """
-        return (type(self) == type(other) and
-                self.puzzle == other.puzzle and
-                all([x in self.children for x in other.children]) and
-                all([x in other.children for x in self.children]))
+        pairs = [(self, other)]
+        while len(pairs) != 0:
+            node, other = pairs.pop()
+            if type(node) != type(other) or node.puzzle != other.puzzle:
+                return False
+            if len(node.children) == 1 and len(other.children) == 1:
+                # along a path, compare the next pair without recursing
+                pairs.append((node.children[0], other.children[0]))
+            elif not (all([x in node.children for x in other.children]) and
+                      all([x in other.children for x in node.children])):
+                return False
+        return True
 
     def __str__(self):
         """
@@ -145,5 +1985,4 @@ class PuzzleNode:
 
         # doctest not feasible.
         """
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        return "".join(_render(self))
@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from exact_cover import ExactCover
 
 
 class SudokuPuzzle(Puzzle):
@@ -6,15 +7,22 @@ class SudokuPuzzle(Puzzle):
     A sudoku puzzle that may be solved, unsolved, or even unsolvable.
     """
 
-    def __init__(self, n, symbols, symbol_set):
+    def __init__(self, n, symbols, symbol_set, propagate=False):
         """
         Create a new nxn SudokuPuzzle self with symbols
         from symbol_set already selected.
 
+        If propagate is True, extensions fill the empty position with the
+        fewest allowed symbols, and then every position left with a single
+        allowed symbol, or that is the only place left for a symbol in its
+        row, column or subsquare, keeping track of the allowed symbols of
+        every position as it goes.
+
         @type self: SudokuPuzzle
         @type n: int
         @type symbols: list[str]
         @type symbol_set: set[str]
+        @type propagate: bool
         """
         assert n > 0
         assert round(n ** (1 / 2)) * round(n ** (1 / 2)) == n
@@ -22,6 +30,15 @@ class SudokuPuzzle(Puzzle):
         assert len(symbol_set) == n
         assert len(symbols) == n ** 2
         self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+        self._propagate = propagate
+        # with propagate, the allowed symbols of each position and the
+        # symbols used in each row, column and subsquare, as bitmasks over
+        # sorted(symbol_set); worked out on first use
+        self._candidates, self._used = None, None
+        # the position filled by the extension that produced self, if any,
+        # so fail_fast need only look at the positions that share a unit
+        # with it
+        self._last = None
 
     def __eq__(self, other):
         """
@@ -55,6 +72,42 @@ class SudokuPuzzle(Puzzle):
                 self._n == other._n and self._symbols == other._symbols and
                 self._symbol_set == other._symbol_set)
 
+    def __hash__(self):
+        """
+        Return a hash of SudokuPuzzle self consistent with __eq__.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s1 = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s2 = SudokuPuzzle(4, grid[:], {"D", "C", "B", "A"})
+        >>> hash(s1) == hash(s2)
+        True
+        """
+        return hash(self.state_key())
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of
+        SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @rtype: tuple[str]
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "B"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.state_key()[0], s.state_key()[-1]
+        ('A', 'B')
+        """
+        return tuple(self._symbols)
+
     def __str__(self):
         """
         Return a human-readable string representation of SudokuPuzzle self.
@@ -161,12 +214,31 @@ class SudokuPuzzle(Puzzle):
         >>> all([s in L1 for s in L2])
         True
         """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of SudokuPuzzle self in the
+        same order, copying the board for each only when it is asked for.
+
+        @type self: SudokuPuzzle
+        @rtype: iterator[SudokuPuzzle]
+
+        >>> grid = ["A", "B", "*", "D"]
+        >>> grid += ["C", "*", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> list(s.iter_extensions()) == s.extensions()
+        True
+        """
+        if self._propagate:
+            for extension in self._propagated_extensions():
+                yield extension
+            return
         # convenient names
         symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
-        if "*" not in symbols:
-            # return an empty generator
-            return [_ for _ in []]
-        else:
+        if "*" in symbols:
             # position of first empty position
             i = symbols.index("*")
             # allowed symbols at position i
@@ -175,11 +247,243 @@ class SudokuPuzzle(Puzzle):
                                (self._row_set(i) |
                                 self._column_set(i) |
                                 self._subsquare_set(i)))
-            # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+            # a SudokuPuzzle with each legal digit at position i, in sorted
+            # order so that extensions come in the same order in every
+            # interpreter
+            for d in sorted(allowed_symbols):
+                extension = SudokuPuzzle(
+                    n, symbols[:i] + [d] + symbols[i + 1:], symbol_set)
+                extension._last = i
+                yield extension
+
+    def legal_moves(self):
+        """
+        Return the moves of SudokuPuzzle self for apply, one for each of
+        its extensions and in the same order.
+
+        Without propagate, a move is the first empty position, a symbol
+        allowed there and the position filled before it, and apply and undo
+        change a single position of the board in place.  With propagate, a
+        move is the board and allowed symbols before and after an
+        extension, which apply and undo swap in.  Propagation may fill
+        many positions at once, so these are whole copies made by
+        legal_moves, and in-place search then copies as much as
+        extensions does; without propagate, or with CompactSudokuPuzzle,
+        each move changes one position.
+
+        @type self: SudokuPuzzle
+        @rtype: list[tuple]
+
+        >>> grid = ["A", "B", "*", "D"]
+        >>> grid += ["C", "*", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).legal_moves()
+        [(2, 'C', None)]
+        """
+        if self._propagate:
+            before = (self._symbols, self._candidates, self._used,
+                      self._last)
+            return [(before, (child._symbols, child._candidates,
+                              child._used, child._last))
+                    for child in self._propagated_extensions()]
+        symbols = self._symbols
+        if "*" not in symbols:
+            return []
+        i = symbols.index("*")
+        allowed_symbols = (self._symbol_set -
+                           (self._row_set(i) |
+                            self._column_set(i) |
+                            self._subsquare_set(i)))
+        return [(i, d, self._last) for d in sorted(allowed_symbols)]
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on SudokuPuzzle self in place, so that
+        it becomes the matching extension.
+
+        This fills in the board that __hash__ reads, so self must not be a
+        set member or dict key while it is moved.
+
+        @type self: SudokuPuzzle
+        @type move: tuple
+        @rtype: None
+
+        >>> grid = ["A", "B", "*", "D"]
+        >>> grid += ["C", "*", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> move = s.legal_moves()[0]
+        >>> s.apply(move)
+        >>> s.state_key()[:4]
+        ('A', 'B', 'C', 'D')
+        >>> s.undo(move)
+        >>> s.state_key()[:4]
+        ('A', 'B', '*', 'D')
+        """
+        if self._propagate:
+            (self._symbols, self._candidates, self._used,
+             self._last) = move[1]
+        else:
+            self._symbols[move[0]] = move[1]
+            self._last = move[0]
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @type move: tuple
+        @rtype: None
+        """
+        if self._propagate:
+            (self._symbols, self._candidates, self._used,
+             self._last) = move[0]
+        else:
+            self._symbols[move[0]] = "*"
+            self._last = move[2]
+
+    def _propagated_extensions(self):
+        # Yield the extensions of SudokuPuzzle self that fill the empty
+        # position with the fewest allowed symbols with each of them, and
+        # then every position that is forced, leaving out those that
+        # run into a contradiction.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: iterator[SudokuPuzzle]
+        if self._candidates is None:
+            self._candidates, self._used = _initial_masks(
+                self._n, self._symbols, self._symbol_set)
+        candidates = self._candidates
+        # position with the fewest allowed symbols
+        fewest, position = self._n + 1, None
+        for i in range(len(candidates)):
+            if self._symbols[i] == "*":
+                count = bin(candidates[i]).count("1")
+                if count < fewest:
+                    fewest, position = count, i
+        if position is None:
+            return
+        mask = candidates[position]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            symbols, child_candidates, used = (self._symbols[:],
+                                               candidates[:], self._used[:])
+            if _place(self._n, symbols, child_candidates, used,
+                      sorted(self._symbol_set), position, bit):
+                child = SudokuPuzzle(self._n, symbols, self._symbol_set,
+                                     True)
+                child._candidates, child._used = child_candidates, used
+                yield child
+
+    def exact_cover_solve(self):
+        """
+        Return a solution of SudokuPuzzle self found by dancing links, or
+        None if there is none.
+
+        @type self: SudokuPuzzle
+        @rtype: SudokuPuzzle | None
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "A", "*"]
+        >>> grid += ["*", "C", "*", "*"]
+        >>> grid += ["*", "*", "*", "B"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> print(s.exact_cover_solve())
+        AD|BC
+        CB|AD
+        -----
+        BC|DA
+        DA|CB
+        >>> grid[1] = "A"
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).exact_cover_solve()
+        """
+        problem, placements = self._exact_cover()
+        order = sorted(self._symbol_set)
+        for rows in problem.solutions(1):
+            symbols = self._symbols[:]
+            for row in rows:
+                position, k = placements[row]
+                symbols[position] = order[k]
+            return SudokuPuzzle(self._n, symbols, self._symbol_set,
+                                self._propagate)
+        return None
+
+    def count_solutions(self, limit=None):
+        """
+        Return the number of solutions of SudokuPuzzle self, counting no
+        further than limit if it is given: limit=2 is enough to tell
+        whether the solution is unique.
+
+        @type self: SudokuPuzzle
+        @type limit: int | None
+        @rtype: int
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "A", "*"]
+        >>> grid += ["*", "C", "*", "*"]
+        >>> grid += ["*", "*", "*", "B"]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).count_solutions()
+        1
+        >>> s = SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})
+        >>> s.count_solutions(), s.count_solutions(2)
+        (288, 2)
+        """
+        problem = self._exact_cover()[0]
+        return len([rows for rows in problem.solutions(limit)])
+
+    def _exact_cover(self):
+        # Return SudokuPuzzle self as an ExactCover problem, with the
+        # (position, index in sorted(symbol_set)) placed by each row.
+        # Columns 0 to n**2 - 1 require each position to be filled, and
+        # column n**2 + unit * n + k requires symbol k to be used in unit,
+        # numbered as in _unit_tables.  The given symbols are rows that are
+        # already selected, so only allowed symbols of the empty positions
+        # need rows of their own.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: (ExactCover, list[(int, int)])
+        n, symbols = self._n, self._symbols
+        position_units = _unit_tables(n)[1]
+        order = sorted(self._symbol_set)
+        candidates = _initial_masks(n, symbols, self._symbol_set)[0]
+        placements = []
+        for i in range(n * n):
+            if symbols[i] != "*":
+                placements.append((i, order.index(symbols[i])))
+        given = len(placements)
+        for i in range(n * n):
+            for k in range(n):
+                if candidates[i] & (1 << k):
+                    placements.append((i, k))
+        problem = ExactCover(4 * n * n,
+                             [[position] + [n * n + unit * n + k
+                                            for unit in
+                                            position_units[position]]
+                              for position, k in placements])
+        for row in range(given):
+            problem.select(row)
+        return problem, placements
+
+    def to_compact(self):
+        """
+        Return the CompactSudokuPuzzle with the same board as SudokuPuzzle
+        self.
+
+        @type self: SudokuPuzzle
+        @rtype: CompactSudokuPuzzle
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.to_compact().to_sudoku() == s
+        True
+        """
+        return CompactSudokuPuzzle(self._n, self._symbols, self._symbol_set)
 
     def fail_fast(self):
         """
@@ -187,6 +491,10 @@ class SudokuPuzzle(Puzzle):
         filled because an instance of each symbol has been used in the same
         row, column, or subsquare.
 
+        For a SudokuPuzzle made by extensions, only the positions sharing a
+        row, column or subsquare with the newly filled one are checked,
+        since no other position has lost an allowed symbol since its parent.
+
         @type self: SudokuPuzzle
         @rtype: bool
 
@@ -200,8 +508,23 @@ class SudokuPuzzle(Puzzle):
         >>> grid[-2] = "B"
         >>> s.fail_fast()
         False
+        >>> grid = ["*", "*", "C", "D"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "B", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> sorted([(str(e)[0], e.fail_fast()) for e in s.extensions()])
+        [('A', True), ('B', False)]
         """
-        for i in range(len(self._symbols)):
+        if self._candidates is not None:
+            # propagation keeps the allowed symbols of every position
+            return any([self._symbols[i] == "*" and self._candidates[i] == 0
+                        for i in range(len(self._symbols))])
+        if self._last is None:
+            positions = range(len(self._symbols))
+        else:
+            positions = _unit_tables(self._n)[2][self._last]
+        for i in positions:
             if self._symbols[i] == "*":
                 row_set = self._row_set(i)
                 column_set = self._column_set(i)
@@ -268,6 +591,403 @@ class SudokuPuzzle(Puzzle):
             [symbols[ul + i + n * j] for i in range(ss) for j in range(ss)])
 
 
+class CompactSudokuPuzzle(Puzzle):
+    """
+    A sudoku puzzle, like SudokuPuzzle, with the board held as a bytearray
+    of symbol codes: 0 for an empty position and k + 1 for the k-th symbol
+    of sorted(symbol_set).  The rows, columns, subsquares and peers of
+    every position are looked up in tables worked out once for each n.
+    """
+
+    def __init__(self, n, symbols, symbol_set):
+        """
+        Create a new nxn CompactSudokuPuzzle self with symbols from
+        symbol_set already selected, as for SudokuPuzzle.
+
+        @type self: CompactSudokuPuzzle
+        @type n: int
+        @type symbols: list[str]
+        @type symbol_set: set[str]
+        @rtype: None
+        """
+        assert n > 0
+        assert round(n ** (1 / 2)) * round(n ** (1 / 2)) == n
+        assert all([d in (symbol_set | {"*"}) for d in symbols])
+        assert len(symbol_set) == n
+        assert len(symbols) == n ** 2
+        self._n, self._symbol_set = n, symbol_set
+        # the symbol of each code
+        self._order = ("*",) + tuple(sorted(symbol_set))
+        codes = {self._order[k]: k for k in range(n + 1)}
+        self._cells = bytearray([codes[d] for d in symbols])
+        # the position filled by the extension that produced self, if any,
+        # as for SudokuPuzzle
+        self._last = None
+
+    def __eq__(self, other):
+        """
+        Return whether CompactSudokuPuzzle self is equivalent to other.
+
+        @type self: CompactSudokuPuzzle
+        @type other: CompactSudokuPuzzle | Any
+        @rtype: bool
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s1 = CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s2 = CompactSudokuPuzzle(4, grid[:], {"D", "C", "B", "A"})
+        >>> s1 == s2, s1 == s1.extensions()[0]
+        (True, False)
+        """
+        return (type(other) == type(self) and
+                self._n == other._n and self._cells == other._cells and
+                self._symbol_set == other._symbol_set)
+
+    def __hash__(self):
+        """
+        Return a hash of CompactSudokuPuzzle self consistent with __eq__.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: int
+        """
+        return hash(self.state_key())
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of
+        CompactSudokuPuzzle self: its symbol codes as bytes.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: bytes
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "B"]
+        >>> s = CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.state_key()[0], s.state_key()[-1]
+        (1, 2)
+        """
+        return bytes(self._cells)
+
+    def __str__(self):
+        """
+        Return a human-readable string representation of
+        CompactSudokuPuzzle self, as for SudokuPuzzle.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: str
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> print(CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}))
+        AB|CD
+        DC|BA
+        -----
+        *D|**
+        **|**
+        """
+        return str(self.to_sudoku())
+
+    def symbols(self):
+        """
+        Return the board of CompactSudokuPuzzle self as a list of symbols,
+        with "*" for empty positions, as used by SudokuPuzzle.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: list[str]
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "B"]
+        >>> s = CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.symbols() == grid
+        True
+        """
+        order = self._order
+        return [order[code] for code in self._cells]
+
+    def to_sudoku(self):
+        """
+        Return the SudokuPuzzle with the same board as CompactSudokuPuzzle
+        self.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: SudokuPuzzle
+        """
+        return SudokuPuzzle(self._n, self.symbols(), self._symbol_set)
+
+    def is_solved(self):
+        """
+        Return whether CompactSudokuPuzzle self is solved.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: bool
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}).is_solved()
+        True
+        >>> grid[9], grid[10] = "D", "A"
+        >>> CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}).is_solved()
+        False
+        """
+        cells = self._cells
+        if 0 in cells:
+            return False
+        everything = (1 << (self._n + 1)) - 2
+        for unit in _unit_tables(self._n)[0]:
+            used = 0
+            for i in unit:
+                used |= 1 << cells[i]
+            if used != everything:
+                return False
+        return True
+
+    def extensions(self):
+        """
+        Return list of extensions of CompactSudokuPuzzle self, filling its
+        first empty position with each symbol allowed there, as for
+        SudokuPuzzle.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: list[CompactSudokuPuzzle]
+
+        >>> grid = ["A", "B", "*", "D"]
+        >>> grid += ["C", "*", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> ([e.to_sudoku() for e in s.to_compact().extensions()] ==
+        ...  s.extensions())
+        True
+        """
+        return list(self.iter_extensions())
+
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of CompactSudokuPuzzle self
+        in the same order, each only when it is asked for.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: iterator[CompactSudokuPuzzle]
+        """
+        cells = self._cells
+        i = cells.find(0)
+        if i != -1:
+            allowed = self._allowed(i)
+            for code in range(1, self._n + 1):
+                if allowed & (1 << code):
+                    child = CompactSudokuPuzzle.__new__(type(self))
+                    child._n, child._symbol_set = self._n, self._symbol_set
+                    child._order, child._last = self._order, i
+                    child._cells = cells[:]
+                    child._cells[i] = code
+                    yield child
+
+    def legal_moves(self):
+        """
+        Return the moves of CompactSudokuPuzzle self for apply, one for
+        each of its extensions and in the same order: the first empty
+        position, the code of a symbol allowed there and the position
+        filled before it.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: list[(int, int, int | None)]
+
+        >>> grid = ["A", "B", "*", "D"]
+        >>> grid += ["C", "*", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}).legal_moves()
+        [(2, 3, None)]
+        """
+        i = self._cells.find(0)
+        if i == -1:
+            return []
+        allowed = self._allowed(i)
+        return [(i, code, self._last) for code in range(1, self._n + 1)
+                if allowed & (1 << code)]
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on CompactSudokuPuzzle self in place,
+        so that it becomes the matching extension.
+
+        This fills in cells that __hash__ reads, so self must not be a set
+        member or dict key while it is moved.
+
+        @type self: CompactSudokuPuzzle
+        @type move: (int, int, int | None)
+        @rtype: None
+        """
+        self._cells[move[0]] = move[1]
+        self._last = move[0]
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to CompactSudokuPuzzle self.
+
+        @type self: CompactSudokuPuzzle
+        @type move: (int, int, int | None)
+        @rtype: None
+        """
+        self._cells[move[0]] = 0
+        self._last = move[2]
+
+    def fail_fast(self):
+        """
+        Return True if and only if there is an empty position of
+        CompactSudokuPuzzle self that no symbol can fill, checking only the
+        peers of the position last filled, if any, as for SudokuPuzzle.
+
+        @type self: CompactSudokuPuzzle
+        @rtype: bool
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "A", "*"]
+        >>> CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}).fail_fast()
+        True
+        >>> grid[-2] = "B"
+        >>> CompactSudokuPuzzle(4, grid, {"A", "B", "C", "D"}).fail_fast()
+        False
+        """
+        cells = self._cells
+        if self._last is None:
+            positions = range(len(cells))
+        else:
+            positions = _unit_tables(self._n)[2][self._last]
+        for i in positions:
+            if cells[i] == 0 and self._allowed(i) == 0:
+                return True
+        return False
+
+    def _allowed(self, i):
+        # Return the codes of the symbols that no peer of position i of
+        # CompactSudokuPuzzle self holds, as a bitmask with bit k set for
+        # code k.
+        #
+        # @type self: CompactSudokuPuzzle
+        # @type i: int
+        # @rtype: int
+        cells, used = self._cells, 0
+        for j in _unit_tables(self._n)[2][i]:
+            used |= 1 << cells[j]
+        return ((1 << (self._n + 1)) - 2) & ~used
+
+
+# (units, units of each position, peers of each position) for each n:
+# units lists the positions of every row, column and subsquare, in that
+# order, and the peers of a position share a unit with it
+_TABLES = {}
+
+
+def _unit_tables(n):
+    # Return the unit and peer tables of nxn SudokuPuzzles.
+    #
+    # @type n: int
+    # @rtype: (list[list[int]], list[(int, int, int)], list[list[int]])
+    if n not in _TABLES:
+        r = round(n ** (1 / 2))
+        units = ([[row * n + col for col in range(n)] for row in range(n)] +
+                 [[row * n + col for row in range(n)] for col in range(n)] +
+                 [[(top + i) * n + left + j for i in range(r)
+                   for j in range(r)]
+                  for top in range(0, n, r) for left in range(0, n, r)])
+        position_units = [(i // n, n + i % n,
+                           2 * n + (i // n // r) * r + i % n // r)
+                          for i in range(n * n)]
+        peers = [sorted(set([j for unit in position_units[i]
+                             for j in units[unit]]) - {i})
+                 for i in range(n * n)]
+        _TABLES[n] = (units, position_units, peers)
+    return _TABLES[n]
+
+
+def _initial_masks(n, symbols, symbol_set):
+    # Return the allowed symbols of each position of symbols and the
+    # symbols used in each unit, as bitmasks over sorted(symbol_set).
+    #
+    # @type n: int
+    # @type symbols: list[str]
+    # @type symbol_set: set[str]
+    # @rtype: (list[int], list[int])
+    units, position_units, _ = _unit_tables(n)
+    bits = {sorted(symbol_set)[k]: 1 << k for k in range(n)}
+    used = [0] * len(units)
+    for i in range(n * n):
+        if symbols[i] != "*":
+            for unit in position_units[i]:
+                used[unit] |= bits[symbols[i]]
+    everything = (1 << n) - 1
+    candidates = [0] * (n * n)
+    for i in range(n * n):
+        if symbols[i] == "*":
+            row, col, box = position_units[i]
+            candidates[i] = everything & ~(used[row] | used[col] | used[box])
+    return candidates, used
+
+
+def _place(n, symbols, candidates, used, order, position, bit):
+    # Put the symbol order[k] for bit == 1 << k at position, updating
+    # symbols, candidates and used in place, then keep filling positions
+    # with a single allowed symbol (naked singles) and symbols with a single
+    # place left in a unit (hidden singles).  Return False if this shows
+    # there is no solution.
+    #
+    # @type n: int
+    # @type symbols: list[str]
+    # @type candidates: list[int]
+    # @type used: list[int]
+    # @type order: list[str]
+    # @type position: int
+    # @type bit: int
+    # @rtype: bool
+    units, position_units, peers = _unit_tables(n)
+    pending = [(position, bit)]
+    while len(pending) != 0:
+        while len(pending) != 0:
+            position, bit = pending.pop()
+            if symbols[position] != "*":
+                if symbols[position] != order[bit.bit_length() - 1]:
+                    return False
+                continue
+            for unit in position_units[position]:
+                if used[unit] & bit:
+                    return False
+                used[unit] |= bit
+            symbols[position] = order[bit.bit_length() - 1]
+            candidates[position] = 0
+            for peer in peers[position]:
+                if candidates[peer] & bit:
+                    candidates[peer] &= ~bit
+                    if candidates[peer] == 0:
+                        return False
+                    if candidates[peer] & (candidates[peer] - 1) == 0:
+                        pending.append((peer, candidates[peer]))
+        everything = (1 << n) - 1
+        for unit in range(len(units)):
+            missing = everything & ~used[unit]
+            while missing:
+                bit = missing & -missing
+                missing ^= bit
+                places = [i for i in units[unit] if candidates[i] & bit]
+                if len(places) == 0:
+                    return False
+                if len(places) == 1:
+                    pending.append((places[0], bit))
+    return True
+
+
 if __name__ == "__main__":
     import doctest
 
@@ -282,7 +1002,8 @@ if __name__ == "__main__":
                       "*", "*", "*", "*", "*", "1", "2", "*", "7",
                       "8", "*", "*", "*", "7", "*", "4", "*", "*",
                       "*", "6", "*", "3", "*", "2", "*", "*", "*"],
-                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"})
+                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"},
+                     propagate=True)
 
     from time import time
 
@@ -309,7 +1030,8 @@ if __name__ == "__main__":
                       "*", "7", "*", "*", "8", "*", "*", "4", "*",
                       "*", "4", "5", "*", "*", "*", "8", "1", "*",
                       "*", "*", "*", "3", "*", "6", "*", "*", "*"],
-                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"})
+                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"},
+                     propagate=True)
 
     print("solving 3-star sudoku from \"That's Puzzling\","
           "November 14th 2015\n\n{}\n\n".format(s))
@@ -332,7 +1054,8 @@ if __name__ == "__main__":
                       "*", "*", "*", "*", "*", "*", "*", "*", "*",
                       "1", "9", "*", "3", "6", "*", "*", "7", "*",
                       "7", "*", "*", "1", "*", "*", "*", "4", "2"],
-                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"})
+                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"},
+                     propagate=True)
 
     print(
         "solving 4-star sudoku from \"That's Puzzling\", "
@@ -0,0 +1,400 @@
+"""
+Indexes of word dictionaries for finding the words that are a single
+letter change away from a given word, as needed by WordLadderPuzzle.
+"""
+from array import array
+from collections import OrderedDict
+import mmap
+import os
+import struct
+import sys
+
+# letters that a single-letter change may introduce
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class WordIndex:
+    """
+    Words of a dictionary bucketed by wildcard pattern: "same" is found in
+    the buckets for "*ame", "s*me", "sa*e" and "sam*", so the words one
+    letter change away from a word are the other words in its buckets.
+    Buckets are kept sorted, so neighbours come in the same order in every
+    interpreter, whatever the iteration order of the word set.
+    """
+
+    def __init__(self, words, adjacency=False):
+        """
+        Create a new WordIndex self over words.  If adjacency is True, the
+        list of neighbours of every word is also computed up front.
+
+        @type self: WordIndex
+        @type words: set[str]
+        @type adjacency: bool
+        @rtype: None
+        """
+        self._buckets = {}
+        for word in words:
+            for i in range(len(word)):
+                # a word is only reached by changing a letter in LETTERS
+                if word[i] in LETTERS:
+                    self._buckets.setdefault(
+                        (i, word[:i] + word[i + 1:]), []).append(word)
+        for bucket in self._buckets.values():
+            bucket.sort()
+        self._other_letters = "".join(sorted(
+            set([letter for word in words for letter in word]) -
+            set(LETTERS)))
+        self._adjacency = None
+        if adjacency:
+            self._adjacency = {word: self._bucket_neighbors(word)
+                               for word in words}
+
+    def neighbors(self, word):
+        """
+        Return the words of WordIndex self that differ from word in exactly
+        one position, holding a letter from LETTERS there.  word need not
+        be in self.
+
+        @type self: WordIndex
+        @type word: str
+        @rtype: list[str]
+
+        >>> index = WordIndex({"same", "came", "some", "word", "cost"})
+        >>> index.neighbors("same")
+        ['came', 'some']
+        >>> sorted(index.neighbors("sole"))
+        ['some']
+        """
+        if self._adjacency is not None and word in self._adjacency:
+            return self._adjacency[word]
+        return self._bucket_neighbors(word)
+
+    def other_letters(self):
+        """
+        Return, in sorted order, the characters outside LETTERS that
+        appear in the words of WordIndex self.
+
+        @type self: WordIndex
+        @rtype: str
+
+        >>> WordIndex({"Bob", "cob", "it's"}).other_letters()
+        "'B"
+        """
+        return self._other_letters
+
+    def _bucket_neighbors(self, word):
+        # Return the words sharing a wildcard bucket with word, other than
+        # word itself.
+        #
+        # @type self: WordIndex
+        # @type word: str
+        # @rtype: list[str]
+        result = []
+        for i in range(len(word)):
+            for other in self._buckets.get((i, word[:i] + word[i + 1:]), []):
+                if other != word:
+                    result.append(other)
+        return result
+
+
+# indexes of the word sets used most recently, by id of the set, oldest
+# first, each with a frozen copy of the words it was built from: each
+# entry keeps its set alive, so only _MAX_INDEXES are kept
+_INDEXES = OrderedDict()
+_MAX_INDEXES = 8
+
+
+def word_index(words):
+    """
+    Return the WordIndex of the set words, building it on first use.
+    Later calls with the same set object share the index while it is among
+    the _MAX_INDEXES sets used most recently and its words are unchanged;
+    a set that has changed in any way since is indexed again.
+
+    @type words: set[str] | frozenset[str]
+    @rtype: WordIndex
+
+    >>> ws = {"same", "came"}
+    >>> word_index(ws) is word_index(ws)
+    True
+    >>> ws.add("some")
+    >>> word_index(ws).neighbors("same")
+    ['came', 'some']
+    >>> ws.remove("some")
+    >>> ws.add("sale")
+    >>> word_index(ws).neighbors("same")
+    ['came', 'sale']
+    >>> others = [word_index(set([str(i)])) for i in range(_MAX_INDEXES)]
+    >>> id(ws) in _INDEXES, len(_INDEXES) == _MAX_INDEXES
+    (False, True)
+    """
+    if isinstance(words, MappedWordGraph):
+        return words
+    entry = _INDEXES.get(id(words))
+    # comparing with the frozen copy costs far less than indexing again
+    if (entry is None or entry[0] is not words or
+            (not isinstance(words, frozenset) and words != entry[1])):
+        # keep a reference to words so its id is not reused by another set
+        entry = (words, words if isinstance(words, frozenset)
+                 else frozenset(words), WordIndex(words))
+        _INDEXES[id(words)] = entry
+        if len(_INDEXES) > _MAX_INDEXES:
+            _INDEXES.popitem(last=False)
+    _INDEXES.move_to_end(id(words))
+    return entry[2]
+
+
+# Compiled word graphs are stored as a header followed by four arrays of
+# unsigned 32-bit ints in native byte order:
+#   word_offsets      word_count + 1 offsets of each word in the text
+#   neighbor_offsets  word_count + 1 offsets of each word's neighbours
+#   neighbors         edge_count ids of neighbouring words
+#   text              the sorted words, UTF-8 encoded and concatenated,
+#                     padded to a multiple of 4 bytes
+# The header records the size and modification time of the source file so
+# that a stale graph is recompiled.
+_MAGIC = b"WLGRAPH" + (b"L" if sys.byteorder == "little" else b"B")
+_HEADER = struct.Struct("=8sQqIII4x")
+
+
+# word graphs opened in this process, by path
+_GRAPHS = {}
+
+
+def open_word_graph(path):
+    """
+    Return the MappedWordGraph for the compiled word graph at path, shared
+    by every call in this process with the same path.
+
+    @type path: str
+    @rtype: MappedWordGraph
+    """
+    if path not in _GRAPHS:
+        _GRAPHS[path] = MappedWordGraph(path)
+    return _GRAPHS[path]
+
+
+def compile_word_graph(source, target):
+    """
+    Compile the whitespace-separated words of the file at path source, and
+    the words one letter change away from each of them, into a word graph
+    file at path target.
+
+    @type source: str
+    @type target: str
+    @rtype: None
+    """
+    status = os.stat(source)
+    with open(source, "r") as words_file:
+        words = set(words_file.read().split())
+    index = WordIndex(words)
+    encoded = sorted([word.encode("utf-8") for word in words])
+    ids = {encoded[i].decode("utf-8"): i for i in range(len(encoded))}
+    word_offsets, neighbor_offsets = array("I", [0]), array("I", [0])
+    neighbors, text = array("I"), bytearray()
+    for word in encoded:
+        text += word
+        word_offsets.append(len(text))
+        neighbors.extend(sorted([ids[other] for other in
+                                 index.neighbors(word.decode("utf-8"))]))
+        neighbor_offsets.append(len(neighbors))
+    text += b"\0" * (-len(text) % 4)
+    # write next to target and rename, so other processes never see a
+    # partly written graph
+    partial = "{}.{}.tmp".format(target, os.getpid())
+    with open(partial, "wb") as graph_file:
+        graph_file.write(_HEADER.pack(_MAGIC, status.st_size,
+                                      status.st_mtime_ns, len(encoded),
+                                      len(neighbors), len(text)))
+        for section in (word_offsets, neighbor_offsets, neighbors):
+            section.tofile(graph_file)
+        graph_file.write(text)
+    os.replace(partial, target)
+
+
+def load_word_graph(source, target=None):
+    """
+    Return the compiled word graph of the words file at path source,
+    stored at path target (source + ".graph" by default), compiling it
+    first if it is missing or was compiled from an older version of
+    source.
+
+    @type source: str
+    @type target: str | None
+    @rtype: MappedWordGraph
+    """
+    if target is None:
+        target = source + ".graph"
+    if not _is_current(source, target):
+        compile_word_graph(source, target)
+    return MappedWordGraph(target)
+
+
+def _is_current(source, target):
+    """
+    Return whether the word graph file at path target exists and was
+    compiled from the current version of the words file at path source.
+
+    @type source: str
+    @type target: str
+    @rtype: bool
+    """
+    if not os.path.exists(target):
+        return False
+    status = os.stat(source)
+    with open(target, "rb") as graph_file:
+        header = graph_file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        return False
+    magic, size, mtime_ns = _HEADER.unpack(header)[:3]
+    return (magic == _MAGIC and size == status.st_size and
+            mtime_ns == status.st_mtime_ns)
+
+
+class MappedWordGraph:
+    """
+    A word graph compiled by compile_word_graph, read through mmap so that
+    words and neighbours are only turned into Python strings when asked
+    for.  A MappedWordGraph can be used both as the word set and as the
+    index of a WordLadderPuzzle.
+    """
+
+    def __init__(self, path):
+        """
+        Open the compiled word graph at path as MappedWordGraph self.
+
+        @type self: MappedWordGraph
+        @type path: str
+        @rtype: None
+        """
+        self.path = path
+        with open(path, "rb") as graph_file:
+            self._map = mmap.mmap(graph_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        (_, _, _, self._count, edge_count,
+         text_size) = _HEADER.unpack_from(self._map)
+        view, start = memoryview(self._map), _HEADER.size
+        sections = []
+        for length in (self._count + 1, self._count + 1, edge_count):
+            sections.append(view[start:start + 4 * length].cast("I"))
+            start += 4 * length
+        self._word_offsets, self._neighbor_offsets, self._neighbors = sections
+        self._text = view[start:start + text_size]
+        # worked out on first use, as it means reading every word
+        self._other_letters = None
+
+    def __reduce__(self):
+        """
+        Pickle MappedWordGraph self by its path, so that another process
+        maps the file itself, once, instead of receiving every word.
+
+        @type self: MappedWordGraph
+        @rtype: tuple
+        """
+        return open_word_graph, (self.path,)
+
+    def __len__(self):
+        """
+        Return the number of words in MappedWordGraph self.
+
+        @type self: MappedWordGraph
+        @rtype: int
+        """
+        return self._count
+
+    def __iter__(self):
+        """
+        Iterate over the words of MappedWordGraph self in sorted order.
+
+        @type self: MappedWordGraph
+        @rtype: iterator[str]
+        """
+        for i in range(self._count):
+            yield self._word(i)
+
+    def __contains__(self, word):
+        """
+        Return whether word is in MappedWordGraph self.
+
+        @type self: MappedWordGraph
+        @type word: str
+        @rtype: bool
+        """
+        return self._find(word) is not None
+
+    def neighbors(self, word):
+        """
+        Return the words of MappedWordGraph self that differ from word in
+        exactly one position, holding a letter from LETTERS there.  word
+        need not be in self.
+
+        @type self: MappedWordGraph
+        @type word: str
+        @rtype: list[str]
+        """
+        i = self._find(word)
+        if i is None:
+            return [word[:j] + letter + word[j + 1:]
+                    for j in range(len(word)) for letter in LETTERS
+                    if letter != word[j] and
+                    word[:j] + letter + word[j + 1:] in self]
+        return [self._word(other) for other in
+                self._neighbors[self._neighbor_offsets[i]:
+                                self._neighbor_offsets[i + 1]]]
+
+    def other_letters(self):
+        """
+        Return, in sorted order, the characters outside LETTERS that
+        appear in the words of MappedWordGraph self.
+
+        @type self: MappedWordGraph
+        @rtype: str
+        """
+        if self._other_letters is None:
+            # the text is padded with NUL bytes, which are in no word
+            self._other_letters = "".join(sorted(
+                set(bytes(self._text).decode("utf-8")) - set(LETTERS) -
+                {"\0"}))
+        return self._other_letters
+
+    def close(self):
+        """
+        Release the memory map of MappedWordGraph self.
+
+        @type self: MappedWordGraph
+        @rtype: None
+        """
+        for view in (self._word_offsets, self._neighbor_offsets,
+                     self._neighbors, self._text):
+            view.release()
+        self._map.close()
+
+    def _word(self, i):
+        # Return the word with id i.
+        #
+        # @type self: MappedWordGraph
+        # @type i: int
+        # @rtype: str
+        return bytes(self._text[self._word_offsets[i]:
+                                self._word_offsets[i + 1]]).decode("utf-8")
+
+    def _find(self, word):
+        # Return the id of word, or None if it is not in the graph, by
+        # binary search over the sorted words.
+        #
+        # @type self: MappedWordGraph
+        # @type word: str
+        # @rtype: int | None
+        target = word.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            found = bytes(self._text[self._word_offsets[middle]:
+                                     self._word_offsets[middle + 1]])
+            if found < target:
+                low = middle + 1
+            elif found > target:
+                high = middle
+            else:
+                return middle
+        return None
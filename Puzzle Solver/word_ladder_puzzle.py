@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from word_graph import LETTERS, word_index
 
 
 class WordLadderPuzzle(Puzzle):
@@ -6,21 +7,36 @@ class WordLadderPuzzle(Puzzle):
     A word-ladder puzzle that may be solved, unsolved, or even unsolvable.
     """
 
-    def __init__(self, from_word, to_word, ws):
+    def __init__(self, from_word, to_word, ws, index=None):
         """
         Create a new word-ladder puzzle with the aim of stepping
         from from_word to to_word using words in ws, changing one
         character at each step.
 
+        index finds the words of ws one character change away from a word;
+        if it is None, the WordIndex shared by all puzzles over ws is used.
+
         @type from_word: str
         @type to_word: str
         @type ws: set[str]
+        @type index: WordIndex | None
         @rtype: None
         """
         (self._from_word, self._to_word, self._word_set) = (from_word,
                                                             to_word, ws)
-        # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        self._index = index
+
+    def __getstate__(self):
+        """
+        Return the attributes of WordLadderPuzzle self to pickle, leaving out
+        the index, which is rebuilt from the word set when it is needed.
+
+        @type self: WordLadderPuzzle
+        @rtype: dict
+        """
+        state = self.__dict__.copy()
+        state["_index"] = None
+        return state
 
     def __eq__(self, other):
         """
@@ -46,6 +62,33 @@ class WordLadderPuzzle(Puzzle):
                 self._to_word == other._to_word and
                 self._word_set == other._word_set)
 
+    def __hash__(self):
+        """
+        Return a hash of WordLadderPuzzle self consistent with __eq__.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+
+        >>> w1 = WordLadderPuzzle("same", "cost", {"same", "cost"})
+        >>> w2 = WordLadderPuzzle("same", "cost", {"cost", "same"})
+        >>> hash(w1) == hash(w2)
+        True
+        """
+        return hash((self._from_word, self._to_word))
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of
+        WordLadderPuzzle self, which is its current word.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> WordLadderPuzzle("same", "cost", {"same", "cost"}).state_key()
+        'same'
+        """
+        return self._from_word
+
     def __str__(self):
         """
         Return a user friendly representation of WordLadderPuzzle self.
@@ -78,16 +121,156 @@ class WordLadderPuzzle(Puzzle):
         >>> len(w1.extensions())
         3
         """
-        configurations = []
-        for i in range(len(self._from_word)):
-            configurations += \
-                [WordLadderPuzzle(self._from_word[:i] + x +
-                                  self._from_word[i+1:],
-                                  self._to_word, self._word_set)
-                 for x in set(self._chars) - set(self._from_word[i])
-                 if self._from_word[:i] + x +
-                 self._from_word[i+1:] in self._word_set]
-        return configurations
+        if self._index is None:
+            self._index = word_index(self._word_set)
+        return [WordLadderPuzzle(word, self._to_word, self._word_set,
+                                 self._index)
+                for word in self._index.neighbors(self._from_word)]
+
+    def iter_extensions(self):
+        """
+        Yield the configurations of extensions of WordLadderPuzzle self in
+        the same order, each only when it is asked for.
+
+        @type self: WordLadderPuzzle
+        @rtype: iterator[WordLadderPuzzle]
+
+        >>> set1 = {'lame', 'came', 'some', 'word', 'lost'}
+        >>> w1 = WordLadderPuzzle("same", "cost", set1)
+        >>> list(w1.iter_extensions()) == w1.extensions()
+        True
+        """
+        if self._index is None:
+            self._index = word_index(self._word_set)
+        for word in self._index.neighbors(self._from_word):
+            yield WordLadderPuzzle(word, self._to_word, self._word_set,
+                                   self._index)
+
+    def legal_moves(self):
+        """
+        Return the moves of WordLadderPuzzle self for apply, one for each
+        of its extensions and in the same order: the current word and the
+        word it changes to.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[(str, str)]
+
+        >>> WordLadderPuzzle("same", "cost", {"same", "some"}).legal_moves()
+        [('same', 'some')]
+        """
+        if self._index is None:
+            self._index = word_index(self._word_set)
+        return [(self._from_word, word)
+                for word in self._index.neighbors(self._from_word)]
+
+    def apply(self, move):
+        """
+        Make move, from legal_moves, on WordLadderPuzzle self in place, so
+        that it becomes the matching extension.
+
+        This changes the word that __hash__ reads, so self must not be a
+        set member or dict key while it is moved.
+
+        @type self: WordLadderPuzzle
+        @type move: (str, str)
+        @rtype: None
+
+        >>> w = WordLadderPuzzle("same", "cost", {"same", "some"})
+        >>> w.apply(("same", "some"))
+        >>> print(w)
+        some -> cost
+        >>> w.undo(("same", "some"))
+        >>> print(w)
+        same -> cost
+        """
+        self._from_word = move[1]
+
+    def undo(self, move):
+        """
+        Take back move, the last one applied to WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @type move: (str, str)
+        @rtype: None
+        """
+        self._from_word = move[0]
+
+    def goal_state(self):
+        """
+        Return the solved configuration of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+
+        >>> print(WordLadderPuzzle("same", "cost", set()).goal_state())
+        cost -> cost
+        """
+        return WordLadderPuzzle(self._to_word, self._to_word, self._word_set,
+                                self._index)
+
+    def reverse_extensions(self):
+        """
+        Return the configurations that have WordLadderPuzzle self as an
+        extension.  A step can only be taken back when _from_word is in the
+        word set, since each step must land on a word from the set, and
+        only at a position where _from_word holds a letter from LETTERS,
+        since a step can only write such a letter.  The word stepped back
+        to may hold any character there.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[WordLadderPuzzle]
+
+        >>> set1 = {'lame', 'came', 'some', 'word', 'lost'}
+        >>> len(WordLadderPuzzle("same", "cost", set1).reverse_extensions())
+        0
+        >>> len(WordLadderPuzzle("lame", "cost", set1).reverse_extensions())
+        1
+        >>> set2 = {"cot", "cob", "con", "Bob", "Cot"}
+        >>> len(WordLadderPuzzle("Bob", "Bob", set2).reverse_extensions())
+        0
+        >>> sorted([str(p) for p in
+        ...         WordLadderPuzzle("cot", "cot", set2).reverse_extensions()])
+        ['Cot -> cot', 'cob -> cot', 'con -> cot']
+        >>> from puzzle_tools import bidirectional_solve
+        >>> print(bidirectional_solve(WordLadderPuzzle("cot", "Bob", set2)))
+        None
+        """
+        word = self._from_word
+        if word not in self._word_set:
+            return []
+        if self._index is None:
+            self._index = word_index(self._word_set)
+        previous = []
+        for other in self._index.neighbors(word):
+            # the one position where other and word differ
+            i = [other[j] != word[j] for j in range(len(word))].index(True)
+            if word[i] in LETTERS:
+                previous.append(other)
+        # neighbors only finds words holding a letter from LETTERS where
+        # they differ from word
+        for i in range(len(word)):
+            if word[i] in LETTERS:
+                for letter in self._index.other_letters():
+                    other = word[:i] + letter + word[i + 1:]
+                    if other in self._word_set:
+                        previous.append(other)
+        return [WordLadderPuzzle(other, self._to_word, self._word_set,
+                                 self._index)
+                for other in previous]
+
+    def heuristic(self):
+        """
+        Return a lower bound on the number of steps needed to reach _to_word:
+        the number of positions at which _from_word and _to_word differ.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+
+        >>> WordLadderPuzzle("same", "cost", set()).heuristic()
+        4
+        """
+        return (sum([a != b for a, b in zip(self._from_word, self._to_word)])
+                + abs(len(self._from_word) - len(self._to_word)))
 
     def is_solved(self):
         """
@@ -113,8 +296,8 @@ if __name__ == '__main__':
     doctest.testmod()
     from puzzle_tools import breadth_first_solve, depth_first_solve
     from time import time
-    with open("words", "r") as words:
-        word_set = set(words.read().split())
+    from word_graph import load_word_graph
+    word_set = load_word_graph("words")
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
     sol = breadth_first_solve(w)